@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Composer benchmarks for MultiWall.
+Generates synthetic source images and monitor layouts, times every display
+mode through the preview and full-resolution paths, and reports wall time
+and peak RSS to a JSON file. Runs headless: only Pillow and the composer are
+imported, never GTK.
+
+Each case runs in a fresh child process so peak RSS and cold caches are
+measured per case.
+
+Usage:
+    python benchmarks/bench_composer.py [-o results.json]
+    python benchmarks/bench_composer.py --quick --baseline baseline.json
+    python benchmarks/bench_composer.py --sizes 1080p 8k --formats jpeg avif
+"""
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageChops, ImageDraw, features
+
+# Source resolutions; 'pattern' is a small tile with transparency
+SOURCE_SIZES = {
+    'pattern': (64, 64),
+    '1080p': (1920, 1080),
+    '1440p': (2560, 1440),
+    '4k': (3840, 2160),
+    '8k': (7680, 4320),
+}
+
+# Encoders used to write the sources, with the Pillow feature they need
+SOURCE_FORMATS = {
+    'jpeg': ('.jpg', 'JPEG', {'quality': 90}, None),
+    'png': ('.png', 'PNG', {'compress_level': 1}, None),
+    'webp': ('.webp', 'WEBP', {'quality': 90}, 'webp'),
+    'avif': ('.avif', 'AVIF', {'quality': 80, 'speed': 8}, 'avif'),
+}
+
+# Monitor layouts as (x, y, width, height): mixed resolutions and offsets
+LAYOUTS = {
+    '1-1080p': [(0, 0, 1920, 1080)],
+    '2-1440p': [(0, 0, 2560, 1440), (2560, 0, 2560, 1440)],
+    '3-mixed': [(0, 540, 1920, 1080), (1920, 0, 3840, 2160), (5760, 240, 1080, 1920)],
+    '4-4k-grid': [(x, y, 3840, 2160) for y in (0, 2160) for x in (0, 3840)],
+    '6-mixed-offset': [
+        (0, 0, 2560, 1440), (2560, 0, 2560, 1440), (5120, 0, 2560, 1440),
+        (320, 1440, 1920, 1080), (2560, 1440, 2560, 1080), (5120, 1600, 1440, 2560),
+    ],
+    '8-wall': [(x * 1920, y * 1080 + (x % 2) * 120, 1920, 1080) for y in (0, 1) for x in range(4)],
+}
+
+MODES = ['fill', 'fit', 'stretch', 'center', 'tile']
+PATHS = ['preview', 'full']
+PREVIEW_SIZE = 1200  # Same max dimension the application previews at
+
+# Distinct files per format and size, assigned round-robin to monitors
+SOURCE_VARIANTS = 2
+
+DEFAULT_TIME_THRESHOLD = 0.25  # Allowed relative slowdown
+DEFAULT_RSS_THRESHOLD = 0.20  # Allowed relative peak RSS growth
+DEFAULT_MIN_TIME = 0.02  # Seconds; smaller differences are noise
+
+
+def available_formats():
+    """Get the source formats this Pillow build can write."""
+    return [name for name, (_, _, _, feature) in SOURCE_FORMATS.items()
+            if feature is None or features.check(feature)]
+
+
+def synthetic_image(size, variant):
+    """
+    Build a deterministic photo-like image: smooth gradients plus texture.
+
+    Args:
+        size: (width, height)
+        variant: Integer changing the colours
+
+    Returns:
+        PIL.Image: RGB image (RGBA with transparency for the pattern size)
+    """
+    w, h = size
+    gradient = Image.linear_gradient('L')
+    red = gradient.resize(size)
+    green = gradient.rotate(90 + 45 * variant).resize(size)
+    blue = Image.radial_gradient('L').resize(size)
+    # Noise rendered at quarter size keeps the files compressible
+    noise = Image.effect_noise((max(1, w // 4), max(1, h // 4)), 40).resize(size)
+    img = Image.merge('RGB', (
+        ImageChops.add(red, noise, scale=1.5),
+        ImageChops.add(green, noise, scale=1.5),
+        ImageChops.add(blue, noise, scale=1.5),
+    ))
+    if size == SOURCE_SIZES['pattern']:
+        mask = Image.new('L', size, 0)
+        ImageDraw.Draw(mask).ellipse((4, 4, w - 5, h - 5), fill=255)
+        img.putalpha(mask)
+    return img
+
+
+def generate_sources(data_dir, formats, sizes):
+    """
+    Write the synthetic source images, reusing files already present.
+
+    Returns:
+        dict: (format, size) -> list of file paths
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    sources = {}
+    for fmt, size_name in itertools.product(formats, sizes):
+        ext, pil_format, params, _ = SOURCE_FORMATS[fmt]
+        paths = []
+        for variant in range(SOURCE_VARIANTS):
+            path = data_dir / f"{size_name}-{variant}{ext}"
+            if not path.exists():
+                img = synthetic_image(SOURCE_SIZES[size_name], variant)
+                if pil_format == 'JPEG':
+                    img = img.convert('RGB')
+                img.save(path, pil_format, **params)
+                print(f"  generated {path.name} ({path.stat().st_size // 1024} KiB)", file=sys.stderr)
+            paths.append(str(path))
+        sources[(fmt, size_name)] = paths
+    return sources
+
+
+def case_id(case):
+    return '/'.join((case['layout'], case['mode'], case['format'], case['size'], case['path']))
+
+
+def run_case(case):
+    """
+    Run one benchmark case. Executed in a fresh child process.
+
+    Returns:
+        dict: Timings in seconds and peak RSS in MiB
+    """
+    logging.getLogger('multiwall').setLevel(logging.WARNING)
+    from multiwall.composer import (
+        add_monitor_numbers, apply_mode_to_image, compose_rects, open_image_try,
+        set_tile_workers
+    )
+
+    set_tile_workers(case['tile_workers'])
+    rects = [tuple(r) for r in case['rects']]
+    states = {
+        str(i): {
+            'file': case['files'][i % len(case['files'])],
+            'mode': case['mode'],
+            'background': '#202020',
+        }
+        for i in range(len(rects))
+    }
+    scale_preview = PREVIEW_SIZE if case['path'] == 'preview' else None
+
+    # Cold composition: decode, resample and paste every monitor
+    start = time.perf_counter()
+    result = compose_rects(rects, states, scale_preview=scale_preview)
+    compose_s = time.perf_counter() - start
+
+    # Recomposition after one monitor changes (incremental path)
+    states['0'] = dict(states['0'], background='#404040')
+    start = time.perf_counter()
+    compose_rects(rects, states, scale_preview=scale_preview)
+    recompose_s = time.perf_counter() - start
+
+    # Display mode alone, on an already decoded source
+    src = open_image_try(case['files'][0])
+    start = time.perf_counter()
+    apply_mode_to_image(src, rects[0][2:], case['mode'], (32, 32, 32, 255))
+    apply_mode_s = time.perf_counter() - start
+
+    # Monitor labels over the composed image
+    min_x = min(r[0] for r in rects)
+    min_y = min(r[1] for r in rects)
+    norm = [(x - min_x, y - min_y, w, h) for (x, y, w, h) in rects]
+    original_size = (max(x + w for x, y, w, h in norm), max(y + h for x, y, w, h in norm))
+    start = time.perf_counter()
+    add_monitor_numbers(result, norm, original_size)
+    numbers_s = time.perf_counter() - start
+
+    return {
+        'compose_s': compose_s,
+        'recompose_s': recompose_s,
+        'apply_mode_s': apply_mode_s,
+        'numbers_s': numbers_s,
+        'output_size': list(result.size),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def peak_rss_mb():
+    """
+    Get this process's peak resident set size in MiB.
+
+    VmHWM is preferred: ru_maxrss survives exec on Linux, so a spawned child
+    would report the parent's peak if it was larger.
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def run_isolated(ctx, case, repeat=1):
+    """
+    Run a case in its own process so caches and peak RSS start fresh.
+
+    With repeat > 1 the case runs in that many processes and the best
+    (lowest) value of each metric is kept, to reduce noise.
+    """
+    best = None
+    for _ in range(repeat):
+        with ctx.Pool(1) as pool:
+            res = pool.apply(run_case, (case,))
+        if best is None:
+            best = res
+        else:
+            for metric, value in res.items():
+                if isinstance(value, float):
+                    best[metric] = min(best[metric], value)
+    return best
+
+
+def build_cases(args, sources):
+    cases = []
+    for layout, mode, fmt, size, path in itertools.product(
+            args.layouts, args.modes, args.formats, args.sizes, args.paths):
+        cases.append({
+            'layout': layout,
+            'mode': mode,
+            'format': fmt,
+            'size': size,
+            'path': path,
+            'rects': LAYOUTS[layout],
+            'files': sources[(fmt, size)],
+            'tile_workers': args.tile_workers,
+        })
+    return cases
+
+
+def compare(results, baseline, time_threshold, rss_threshold, min_time):
+    """
+    Compare results against a baseline.
+
+    Returns:
+        list: Human readable regression descriptions
+    """
+    base_cases = baseline.get('cases', {})
+    regressions = []
+    for cid, res in results['cases'].items():
+        base = base_cases.get(cid)
+        if base is None or 'error' in res or 'error' in base:
+            continue
+        for metric in ('compose_s', 'recompose_s', 'apply_mode_s', 'numbers_s'):
+            old, new = base.get(metric), res.get(metric)
+            if old is None or new is None or new - old < min_time:
+                continue
+            if new > old * (1 + time_threshold):
+                regressions.append(f"{cid}: {metric} {old:.3f}s -> {new:.3f}s (+{(new / old - 1) * 100:.0f}%)")
+        old, new = base.get('peak_rss_mb'), res.get('peak_rss_mb')
+        if old and new and new > old * (1 + rss_threshold):
+            regressions.append(f"{cid}: peak_rss_mb {old:.0f} -> {new:.0f} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark the MultiWall composer (headless).')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='Results JSON file')
+    parser.add_argument('--baseline', help='Baseline results JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the results to the baseline file instead of comparing')
+    parser.add_argument('--time-threshold', type=float, default=DEFAULT_TIME_THRESHOLD,
+                        help='Allowed relative slowdown before failing (default: %(default)s)')
+    parser.add_argument('--rss-threshold', type=float, default=DEFAULT_RSS_THRESHOLD,
+                        help='Allowed relative peak RSS growth before failing (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                        help='Ignore slowdowns smaller than this many seconds (default: %(default)s)')
+    parser.add_argument('--layouts', nargs='+', choices=list(LAYOUTS), default=list(LAYOUTS))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--formats', nargs='+', choices=list(SOURCE_FORMATS), default=None,
+                        help='Source formats (default: all supported by Pillow)')
+    parser.add_argument('--sizes', nargs='+', choices=list(SOURCE_SIZES), default=['4k'],
+                        help='Source resolutions (default: 4k)')
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=PATHS)
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Runs per case, keeping the best time (default: %(default)s)')
+    parser.add_argument('--tile-workers', type=int, default=min(os.cpu_count() or 1, 8))
+    parser.add_argument('--quick', action='store_true',
+                        help='Small matrix: three layouts, JPEG and PNG sources')
+    parser.add_argument('--data-dir', help='Keep generated sources here and reuse them')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    supported = available_formats()
+    if args.quick:
+        args.layouts = list(LAYOUTS)[:3]
+        args.formats = args.formats or ['jpeg', 'png']
+    if args.formats is None:
+        args.formats = supported
+    for fmt in [f for f in args.formats if f not in supported]:
+        print(f"Skipping {fmt}: not supported by this Pillow build", file=sys.stderr)
+    args.formats = [f for f in args.formats if f in supported]
+
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix='multiwall-bench-'))
+    try:
+        print("Generating sources...", file=sys.stderr)
+        sources = generate_sources(data_dir, args.formats, args.sizes)
+        cases = build_cases(args, sources)
+
+        ctx = multiprocessing.get_context('spawn')
+        results = {
+            'meta': {
+                'python': platform.python_version(),
+                'pillow': Image.__version__,
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+                'tile_workers': args.tile_workers,
+                'repeat': args.repeat,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            },
+            'cases': {},
+        }
+        for n, case in enumerate(cases, 1):
+            cid = case_id(case)
+            try:
+                res = run_isolated(ctx, case, args.repeat)
+                print(f"[{n}/{len(cases)}] {cid}: compose {res['compose_s']:.3f}s, "
+                      f"peak {res['peak_rss_mb']:.0f} MiB", file=sys.stderr)
+            except Exception as e:
+                res = {'error': f"{type(e).__name__}: {e}"}
+                print(f"[{n}/{len(cases)}] {cid}: FAILED {res['error']}", file=sys.stderr)
+            results['cases'][cid] = res
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    Path(args.output).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline and args.update_baseline:
+        Path(args.baseline).write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"Baseline updated: {args.baseline}", file=sys.stderr)
+    elif args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.time_threshold, args.rss_threshold, args.min_time)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+    failed = sum(1 for res in results['cases'].values() if 'error' in res)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
-from multiwall.app import MultiWallApp
+import sys
 
 
 def main():
+    # Headless commands must not import GTK
+    if len(sys.argv) > 1 and sys.argv[1] in ('compose', 'apply'):
+        from multiwall.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from multiwall.app import MultiWallApp
     app = MultiWallApp()
     app.run()
 
@@ -1,10 +1,16 @@
 import i18n
 import os
 import sys
+import time
 from pathlib import Path
 from .logger import get_logger, setup_logger
+from . import profiling
+from .profiling import span
 import logging
 
+# Reference point for --startup-trace
+_STARTUP_T0 = time.perf_counter()
+
 # Setup logger with DEBUG level if --debug flag is passed
 if '--debug' in sys.argv:
     setup_logger('multiwall', logging.DEBUG)
@@ -12,21 +18,28 @@ if '--debug' in sys.argv:
 else:
     setup_logger('multiwall', logging.INFO)
 
+STARTUP_TRACE = '--startup-trace' in sys.argv
+if STARTUP_TRACE:
+    sys.argv.remove('--startup-trace')
+
+# --profile[=FILE] records stage timings and writes them as a Chrome trace
+# (default: multiwall-trace.json) with a summary on stderr at exit
+PROFILE_FILE = None
+for _arg in sys.argv[1:]:
+    if _arg == '--profile' or _arg.startswith('--profile='):
+        PROFILE_FILE = _arg.partition('=')[2] or profiling.DEFAULT_TRACE_FILE
+        sys.argv.remove(_arg)
+        profiling.enable()
+        break
+
 logger = get_logger(__name__)
 
 # Ensure UTF-8 for emojis
 if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8')
 
-# i18n configuration
 translations_path = Path(__file__).parent / 'translations'
-i18n.load_path.clear()
-i18n.load_path.append(str(translations_path))
-i18n.set('filename_format', '{locale}.{format}')
-i18n.set('file_format', 'json')
-i18n.set('fallback', 'en')
-i18n.set('error_on_missing_translation', False)
-i18n.set('error_on_missing_placeholder', False)
+
 
 # Detect system language
 def detect_system_language():
@@ -56,23 +69,31 @@ def detect_system_language():
     logger.info("Using default language: en")
     return 'en'
 
-detected_lang = detect_system_language()
-i18n.set('locale', detected_lang)
 
-logger.debug(f"Translations path: {translations_path}")
-logger.debug(f"Translations path exists: {translations_path.exists()}")
-if translations_path.exists():
-    logger.debug(f"Translation files: {list(translations_path.glob('*.json'))}")
+def setup_i18n():
+    """Configure translations and the locale (called when the app starts)."""
+    i18n.load_path.clear()
+    i18n.load_path.append(str(translations_path))
+    i18n.set('filename_format', '{locale}.{format}')
+    i18n.set('file_format', 'json')
+    i18n.set('fallback', 'en')
+    i18n.set('error_on_missing_translation', False)
+    i18n.set('error_on_missing_placeholder', False)
+    i18n.set('locale', detect_system_language())
+    logger.debug(f"Translations path: {translations_path}")
+
 
-import subprocess
 from gi import require_version
 require_version('Gtk', '4.0')
-from gi.repository import Gtk, Gdk, GLib, GdkPixbuf, Gio
-from .config import load_config, save_config
-from .composer import compose_image
+from gi.repository import Gtk, Gdk, GLib, Gio
+from .config import ConfigStore, get_int_option, load_config
 from .monitor_row import MonitorRow
-from .utils import pil_to_pixbuf
-from .image_sidebar import ImageSidebar
+# The composer (Pillow), render service and sidebar are imported when first
+# used so the window can be shown before they load
+
+
+# Maximum preview dimension, in pixels
+PREVIEW_SIZE = 1200
 
 
 def is_running_in_docker():
@@ -87,22 +108,42 @@ else:
     TMP_OUTPUT = "/tmp/multiwall_combined.jpg"
 
 
+def read_xdg_user_dir(name):
+    """
+    Read an XDG user directory from user-dirs.dirs, as xdg-user-dir does.
+    
+    Args:
+        name: Directory name, e.g. 'PICTURES'
+        
+    Returns:
+        str: Directory path or None if not configured
+    """
+    config_home = os.environ.get('XDG_CONFIG_HOME') or str(Path.home() / ".config")
+    key = f"XDG_{name}_DIR="
+    try:
+        with open(Path(config_home) / "user-dirs.dirs", encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line.startswith(key):
+                    continue
+                value = line[len(key):].strip().strip('"')
+                # Only $HOME is expanded, relative paths are relative to HOME
+                if value.startswith('$HOME'):
+                    value = str(Path.home()) + value[len('$HOME'):]
+                elif not value.startswith('/'):
+                    value = str(Path.home() / value)
+                return value.rstrip('/') or None
+    except OSError as e:
+        logger.debug(f"Could not read user-dirs.dirs: {e}")
+    return None
+
+
 def get_default_pictures_directory():
     """Get default system pictures directory."""
-    try:
-        # Try to get from XDG user dirs
-        result = subprocess.run(
-            ['xdg-user-dir', 'PICTURES'],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        pictures_dir = result.stdout.strip()
-        if pictures_dir and os.path.exists(pictures_dir):
-            logger.debug(f"System pictures directory: {pictures_dir}")
-            return pictures_dir
-    except Exception as e:
-        logger.warning(f"Could not get xdg-user-dir: {e}")
+    pictures_dir = read_xdg_user_dir('PICTURES')
+    if pictures_dir and os.path.exists(pictures_dir):
+        logger.debug(f"System pictures directory: {pictures_dir}")
+        return pictures_dir
     
     # Fallback: try common locations based on language
     home = Path.home()
@@ -131,6 +172,7 @@ class MultiWallApp(Gtk.Application):
         
         super().__init__(application_id='com.multiwall.app')
         logger.info("Initializing MultiWall application")
+        setup_i18n()
 
         css_provider = Gtk.CssProvider()
         css_provider.load_from_string("""
@@ -158,11 +200,39 @@ class MultiWallApp(Gtk.Application):
         )
         
         self.settings = load_config()
+        # Changes are saved in the background, coalescing quick edits
+        self.config_store = ConfigStore()
+        # Optional decoded-image cache budget (in MiB); invalid values
+        # keep the defaults
+        cache_mb = get_int_option(self.settings, 'image_cache_mb')
+        if cache_mb is not None:
+            from .image_cache import get_image_cache
+            get_image_cache().configure(cache_mb * 1024 * 1024)
+        # Optional number of monitor tiles rendered in parallel
+        tile_workers = get_int_option(self.settings, 'tile_workers', minimum=1)
+        if tile_workers is not None:
+            from .composer import set_tile_workers
+            set_tile_workers(tile_workers)
+        # Optional number of applied renders kept in ~/.cache/multiwall
+        render_cache_size = get_int_option(self.settings, 'render_cache_size')
+        if render_cache_size is not None:
+            from .render_cache import set_max_renders
+            set_max_renders(render_cache_size)
         # Use last saved directory, or detect system default
         self.last_directory = self.settings.get('last_directory', get_default_pictures_directory())
         logger.debug(f"Initial pictures directory: {self.last_directory}")
         
+        self.render_service = None  # Created with the first preview
+        
         self.connect('activate', self.on_activate)
+        self.connect('shutdown', self.on_shutdown)
+
+    def on_shutdown(self, app):
+        self.config_store.close()
+        if self.render_service is not None:
+            self.render_service.shutdown()
+        if PROFILE_FILE:
+            profiling.finish(PROFILE_FILE)
 
     def on_activate(self, app):
         logger.info("Activating application window")
@@ -175,6 +245,37 @@ class MultiWallApp(Gtk.Application):
         self.build_ui()
         self.window.present()
         logger.info("Application window presented")
+        
+        # Render the preview and load thumbnails once the first frame is
+        # on screen, so they don't delay showing the window
+        frame_clock = self.window.get_frame_clock()
+        if frame_clock is None:
+            GLib.idle_add(self.on_first_frame, None, None)
+        else:
+            self._first_frame_handler = frame_clock.connect('after-paint', self.on_first_frame)
+
+    def on_first_frame(self, frame_clock, *_):
+        """Start deferred startup work after the window is first painted."""
+        if frame_clock is not None:
+            frame_clock.disconnect(self._first_frame_handler)
+        profiling.record('startup_first_frame', int(_STARTUP_T0 * 1e9), time.perf_counter_ns())
+        if STARTUP_TRACE:
+            elapsed_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+            logger.info(f"Startup trace: first frame after {elapsed_ms:.1f} ms")
+            print(f"multiwall: first frame after {elapsed_ms:.1f} ms", file=sys.stderr)
+        # Leave the frame clock before doing the work
+        GLib.idle_add(self.load_deferred)
+        return False
+
+    def load_deferred(self):
+        """Render the initial preview and load the sidebar thumbnails."""
+        logger.debug("Running deferred startup work")
+        self.update_preview()
+        self.sidebar.load_images()
+        # Detect the desktop's wallpaper backend once, before the first Apply
+        from .wallpaper_backends import detect_backend
+        detect_backend()
+        return False
 
     def show_about_dialog(self, button):
         """Show About dialog."""
@@ -322,7 +423,8 @@ class MultiWallApp(Gtk.Application):
 
         # === IMAGE SIDEBAR (at the end, on the right) ===
         logger.debug("Creating image sidebar")
-        self.sidebar = ImageSidebar(self.last_directory, self.on_image_selected)
+        from .image_sidebar import ImageSidebar
+        self.sidebar = ImageSidebar(self.last_directory, self.on_image_selected, load=False)
         main_container.append(self.sidebar)
 
         # Prevent sidebar from competing for space
@@ -354,8 +456,7 @@ class MultiWallApp(Gtk.Application):
 
         GLib.timeout_add(150, _poll_window_size)
 
-        logger.debug("UI build complete, updating initial preview")
-        self.update_preview()
+        logger.debug("UI build complete")
 
     def on_image_selected(self, image_path, button):
         """Callback when an image is selected from sidebar."""
@@ -403,33 +504,77 @@ class MultiWallApp(Gtk.Application):
         logger.debug(f"Gathered states for {len(states)} monitors")
         return states
 
+    def current_config(self):
+        """
+        Build the configuration to persist.
+        
+        The monitor layout is saved so the headless CLI can compose without
+        querying GDK.
+        
+        Returns:
+            dict: Configuration dictionary
+        """
+        from .composer import monitor_rects
+        # Keep optional settings (output profile, caches...) from the file
+        self.settings.update({
+            'monitors': self.gather_states(),
+            'last_directory': self.last_directory,
+            'layout': [list(rect) for rect in monitor_rects(self.monitors)]
+        })
+        return dict(self.settings)
+
     def update_preview(self, *_):
-        """Update the wallpaper preview."""
-        try:
-            logger.debug("=== Updating preview ===")
-            states = self.gather_states()
-            
-            preview = compose_image(self.monitors, states, scale_preview=1200)
+        """Update the wallpaper preview (rendered on a background worker)."""
+        from .composer import compose_rects, monitor_rects
+        from .render_service import RenderService
+        from .utils import pil_to_texture
+        
+        logger.debug("=== Updating preview ===")
+        if self.render_service is None:
+            self.render_service = RenderService()
+        states = self.gather_states()
+        rects = monitor_rects(self.monitors)
+        
+        def render_draft(generation):
+            # Quick frame from already decoded sources, replaced below
+            draft = compose_rects(rects, states, scale_preview=PREVIEW_SIZE, draft=True)
+            if draft is None:
+                # A source is still being decoded: keep the current preview
+                return None
+            with span('texture'):
+                return pil_to_texture(draft)
+        
+        def render(generation):
+            preview = compose_rects(rects, states, scale_preview=PREVIEW_SIZE)
             logger.debug(f"Preview generated: {preview.size}")
-            
-            self.preview.set_pixbuf(None)  # Clear previous
-            
-            pix = pil_to_pixbuf(preview.convert('RGB'))
-            logger.debug(f"Pixbuf created: {pix.get_width()}x{pix.get_height()}")
-            
-            self.preview.set_pixbuf(pix)
-            logger.debug("Preview updated successfully")
-        except Exception as e:
-            logger.error(f"Error updating preview: {e}", exc_info=True)
-
-    def on_monitor_changed(self, *_):
-        """Callback when monitor configuration changes."""
+            # The texture is built on the worker, off the main loop
+            with span('texture'):
+                return pil_to_texture(preview)
+        
+        self.render_service.submit(render, self.show_preview, draft=render_draft)
+
+    def show_preview(self, texture):
+        """Show a rendered preview texture (main loop)."""
+        logger.debug(f"Texture created: {texture.get_width()}x{texture.get_height()}")
+        with span('show_preview'):
+            self.preview.set_paintable(texture)
+        logger.debug("Preview updated successfully")
+
+    def on_monitor_changed(self, index=None):
+        """
+        Callback when monitor configuration changes.
+        
+        Only the tiles of monitors whose state changed are re-rendered by
+        the composer; the rest are reused from the retained canvas.
+        
+        Args:
+            index: Index of the monitor that changed, if known
+        """
+        logger.debug(f"Monitor {index} changed, updating preview")
         self.update_preview()
         # Auto-save configuration on change
-        save_config({
-            'monitors': self.gather_states(),
-            'last_directory': self.last_directory
-        })
+        with span('save_config'):
+            self.config_store.save(self.current_config())
 
     def on_apply(self, *_):
         """Apply the wallpaper configuration."""
@@ -437,30 +582,33 @@ class MultiWallApp(Gtk.Application):
             logger.info("=== Applying wallpaper ===")
             
             # Import wallpaper module
+            from .composer import monitor_rects
+            from .render_cache import render_to_file
             from .wallpaper_setter import apply_wallpaper, get_wallpaper_path
             
             # Auto-save configuration before applying
-            save_config({
-                'monitors': self.gather_states(),
-                'last_directory': self.last_directory
-            })
-            
-            # Generate combined image
-            combined = compose_image(self.monitors, self.gather_states())
-            logger.debug(f"Combined image generated: {combined.size}")
-            
-            # Get appropriate path based on environment
-            output_path = get_wallpaper_path()
+            with span('save_config'):
+                self.config_store.save(self.current_config())
             
-            # Ensure directory exists
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            # Get appropriate path based on environment and output format
+            profile = self.settings.get('output_profile')
+            output_path = get_wallpaper_path(profile)
             
-            # Save image
-            combined.convert('RGB').save(output_path, quality=95)
+            # Compose and save the image, or reuse an identical earlier render
+            rects = monitor_rects(self.monitors)
+            with span('render_to_file'):
+                render_to_file(
+                    rects,
+                    self.gather_states(),
+                    output_path,
+                    profile,
+                    self.settings.get('output_options')
+                )
             logger.info(f"Wallpaper saved to: {output_path}")
             
             # Apply wallpaper using appropriate method
-            success, message, script_path = apply_wallpaper(output_path)
+            with span('apply_wallpaper'):
+                success, message, script_path = apply_wallpaper(output_path, rects)
             
             if success:
                 logger.info(f"Wallpaper applied successfully")
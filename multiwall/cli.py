@@ -0,0 +1,237 @@
+"""
+Headless command line interface for MultiWall.
+Composes and applies the configured wallpaper without importing GTK, for
+use from login scripts and configuration management.
+
+Usage:
+    multiwall compose [--layout LAYOUT] [--config FILE] [--profile PROFILE] [--trace [FILE]] [-o OUTPUT]
+    multiwall apply [--layout LAYOUT] [--config FILE] [--profile PROFILE] [--trace [FILE]]
+"""
+import argparse
+import json
+import logging
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from . import profiling
+from .encoders import PROFILES, extension_matches, profile_extension, profile_for_path
+from .logger import get_logger, setup_logger
+from .profiling import span
+
+logger = get_logger(__name__)
+
+# xrandr-style geometry: WIDTHxHEIGHT+X+Y
+_GEOMETRY_RE = re.compile(r'^(\d+)x(\d+)([+-]\d+)([+-]\d+)$')
+# xrandr --listmonitors line: " 0: +*DP-1 2560/597x1440/336+0+0  DP-1"
+_LISTMONITORS_RE = re.compile(r'(\d+)/\d+x(\d+)/\d+([+-]\d+)([+-]\d+)')
+
+
+def parse_layout(spec):
+    """
+    Parse a monitor layout given on the command line.
+
+    Args:
+        spec: Comma-separated WIDTHxHEIGHT+X+Y geometries, or a path to a
+            JSON file with a list of [x, y, width, height] rectangles
+
+    Returns:
+        list: (x, y, width, height) tuples
+
+    Raises:
+        ValueError: If the layout cannot be parsed
+    """
+    if Path(spec).is_file():
+        data = json.loads(Path(spec).read_text(encoding='utf-8'))
+        return [tuple(int(v) for v in rect) for rect in data]
+
+    rects = []
+    for part in spec.split(','):
+        match = _GEOMETRY_RE.match(part.strip())
+        if not match:
+            raise ValueError(f"Invalid monitor geometry: {part!r} (expected WIDTHxHEIGHT+X+Y)")
+        w, h, x, y = (int(v) for v in match.groups())
+        rects.append((x, y, w, h))
+    return rects
+
+
+def detect_layout():
+    """
+    Detect the monitor layout without GTK, using xrandr.
+
+    Returns:
+        list: (x, y, width, height) tuples, or an empty list if unavailable
+    """
+    try:
+        result = subprocess.run(
+            ['xrandr', '--listmonitors'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except Exception as e:
+        logger.debug(f"xrandr not available: {e}")
+        return []
+    rects = []
+    for line in result.stdout.splitlines()[1:]:
+        match = _LISTMONITORS_RE.search(line)
+        if match:
+            w, h, x, y = (int(v) for v in match.groups())
+            rects.append((x, y, w, h))
+    logger.debug(f"Layout detected with xrandr: {rects}")
+    return rects
+
+
+def resolve_layout(args, config):
+    """
+    Get the monitor layout from, in order: --layout, the layout last saved
+    by the GUI in config.json, or xrandr.
+
+    Returns:
+        list: (x, y, width, height) tuples
+    """
+    if args.layout:
+        return parse_layout(args.layout)
+    if config.get('layout'):
+        logger.debug("Using layout saved in configuration")
+        return [tuple(rect) for rect in config['layout']]
+    return detect_layout()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='multiwall',
+        description='Compose and apply multi-monitor wallpapers without the GUI.'
+    )
+    # Options follow the command: the multiwall launcher only runs the CLI
+    # when the first argument is a command.
+    # --profile selects the output format, so stage timing is --trace
+    trace_help = ('Record stage timings, write a Chrome trace to FILE '
+                  f'(default: {profiling.DEFAULT_TRACE_FILE}) and print a summary')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for command, help_text in (
+        ('compose', 'Compose the wallpaper image and write it to a file'),
+        ('apply', 'Compose the wallpaper and set it as the desktop background'),
+    ):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument(
+            '--layout',
+            help='Monitor layout as WIDTHxHEIGHT+X+Y[,...] or a JSON file of '
+                 '[x, y, width, height] rectangles (default: saved or detected)'
+        )
+        sub.add_argument('--config', help='Configuration file (default: ~/.config/multiwall/config.json)')
+        sub.add_argument('--profile', choices=list(PROFILES),
+                         help='Output format profile (default: output_profile from the configuration, or jpeg-fast)')
+        sub.add_argument('--debug', action='store_true', help='Enable debug logging')
+        sub.add_argument('--trace', nargs='?', const=profiling.DEFAULT_TRACE_FILE, metavar='FILE',
+                         help=trace_help)
+        if command == 'compose':
+            sub.add_argument('-o', '--output', help='Output image path (default: wallpaper path)')
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the command line interface.
+
+    Args:
+        argv: Arguments (default: sys.argv[1:])
+
+    Returns:
+        int: Exit status
+    """
+    args = build_parser().parse_args(argv)
+    setup_logger('multiwall', logging.DEBUG if args.debug else logging.WARNING)
+    if not args.trace:
+        return run(args)
+    profiling.enable()
+    try:
+        return run(args)
+    finally:
+        profiling.finish(args.trace)
+
+
+def run(args):
+    """
+    Run a parsed command.
+
+    Args:
+        args: Arguments from build_parser()
+
+    Returns:
+        int: Exit status
+    """
+
+    from .config import CONFIG_FILE, get_int_option, load_config
+    if args.config:
+        try:
+            config = json.loads(Path(args.config).read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"multiwall: cannot read configuration {args.config}: {e}", file=sys.stderr)
+            return 1
+    else:
+        config = load_config()
+
+    states = config.get('monitors', {})
+    if not states:
+        print(f"multiwall: no monitors configured in {args.config or CONFIG_FILE}", file=sys.stderr)
+        return 1
+
+    try:
+        rects = resolve_layout(args, config)
+    except (OSError, ValueError) as e:
+        print(f"multiwall: {e}", file=sys.stderr)
+        return 2
+    if not rects:
+        print("multiwall: could not determine monitor layout, use --layout", file=sys.stderr)
+        return 1
+
+    from .composer import set_tile_workers
+    from .render_cache import render_to_file, set_max_renders
+    from .wallpaper_setter import apply_wallpaper, get_wallpaper_path
+
+    tile_workers = get_int_option(config, 'tile_workers', minimum=1)
+    if tile_workers is not None:
+        set_tile_workers(tile_workers)
+    render_cache_size = get_int_option(config, 'render_cache_size')
+    if render_cache_size is not None:
+        set_max_renders(render_cache_size)
+
+    profile = args.profile or config.get('output_profile')
+    options = config.get('output_options')
+    output_path = getattr(args, 'output', None)
+    if output_path and not extension_matches(output_path, profile):
+        if args.profile:
+            print(f"multiwall: {output_path} does not match --profile {args.profile} "
+                  f"(expected a {profile_extension(args.profile)} file)", file=sys.stderr)
+            return 2
+        # Without --profile, the extension chooses the format
+        profile = profile_for_path(output_path)
+        if profile is None:
+            extensions = sorted({profile_extension(name) for name in PROFILES})
+            print(f"multiwall: unsupported output format {Path(output_path).suffix or '(none)'}, "
+                  f"use one of: {', '.join(extensions)}", file=sys.stderr)
+            return 2
+        # The configured options belong to the configured profile
+        options = None
+    output_path = output_path or get_wallpaper_path(profile)
+    with span('render_to_file'):
+        render_to_file(rects, states, output_path, profile, options)
+    logger.info(f"Wallpaper saved to: {output_path}")
+
+    if args.command == 'compose':
+        print(output_path)
+        return 0
+
+    with span('apply_wallpaper'):
+        success, message, script_path = apply_wallpaper(output_path, rects)
+    if not success:
+        print(f"multiwall: {message}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
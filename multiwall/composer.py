@@ -1,43 +1,97 @@
+import functools
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageOps, ImageColor, ImageDraw, ImageFont
 from pathlib import Path
 from .config import DEFAULT_OPTIONS
+from .image_cache import file_identity, get_image_cache
 from .logger import get_logger
+from .profiling import span
 
 logger = get_logger(__name__)
 
-def open_image_try(path):
+# Cheap filter used for draft previews
+DRAFT_RESAMPLE = Image.BILINEAR
+
+# Modes supported by Image.reduce()
+_REDUCIBLE_MODES = {'L', 'LA', 'RGB', 'RGBA', 'RGBa', 'I', 'F', 'CMYK'}
+
+
+def _reduce_on_load(img, min_size):
+    """
+    Shrink an image while decoding, keeping it at least min_size.
+    
+    JPEG sources are decoded directly at 1/2, 1/4 or 1/8 scale through
+    Image.draft(); any remaining integer factor is removed with a cheap
+    box reduction before the final (LANCZOS) resampling.
+    
+    Args:
+        img: Freshly opened (not yet loaded) PIL image
+        min_size: Minimum (width, height) the result must keep
+        
+    Returns:
+        PIL.Image: Reduced image
+    """
+    mw, mh = max(1, min_size[0]), max(1, min_size[1])
+    img.draft(None, (mw, mh))
+    factor = min(img.width // mw, img.height // mh)
+    if factor >= 2 and img.mode in _REDUCIBLE_MODES:
+        img = img.reduce(factor)
+    logger.debug("Reduced on load to %s (requested >= %sx%s)", img.size, mw, mh)
+    return img
+
+
+def has_transparency(img):
+    """Check whether an image has an alpha channel or a transparent color."""
+    return img.mode in ('RGBA', 'RGBa', 'LA', 'La', 'PA') or 'transparency' in img.info
+
+
+def open_image_try(path, draft_size=None, scale=None):
     """
     Try to open an image with robust support for AVIF and other formats.
     Uses Pillow directly with improved error handling.
     
     Args:
         path: Path to the image file
+        draft_size: Optional minimum (width, height) to decode at; the image
+            is reduced while loading but never below this size
+        scale: Optional factor the image is resized by, decoding at reduced
+            size where possible (used for preview rendering)
         
     Returns:
-        PIL.Image: RGBA image or None if failed
+        PIL.Image: RGBA image if the source has transparency, RGB otherwise,
+            or None if failed
     """
-    logger.debug(f"Attempting to open image: {path}")
-    
-    if not os.path.exists(path):
-        logger.error(f"Image file does not exist: {path}")
-        return None
-    
-    logger.debug(f"File exists: size={os.path.getsize(path)} bytes, "
-                f"permissions={oct(os.stat(path).st_mode)}")
+    logger.debug("Attempting to open image: %s", path)
     
     try:
         # Try to open with Pillow
-        logger.debug(f"Opening with Image.open()...")
-        img = Image.open(path)
-        logger.debug(f"Image opened: format={img.format}, mode={img.mode}, size={img.size}")
-        
-        # Convert to RGBA for consistency
-        logger.debug(f"Converting to RGBA...")
-        rgba_img = img.convert('RGBA')
-        logger.debug(f"Conversion successful: {rgba_img.mode}, {rgba_img.size}")
-        return rgba_img
-        
+        logger.debug("Opening with Image.open()...")
+        with span('decode'):
+            img = Image.open(path)
+            logger.debug("Image opened: format=%s, mode=%s, size=%s", img.format, img.mode, img.size)
+        
+            exact_size = None
+            if scale is not None:
+                exact_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+                draft_size = exact_size
+            if draft_size:
+                img = _reduce_on_load(img, draft_size)
+        
+            # Only materialize an alpha channel when the source has one
+            target_mode = 'RGBA' if has_transparency(img) else 'RGB'
+            logger.debug("Converting to %s...", target_mode)
+            out_img = img.convert(target_mode)
+            if exact_size and out_img.size != exact_size:
+                out_img = out_img.resize(exact_size, Image.LANCZOS)
+            logger.debug("Conversion successful: %s, %s", out_img.mode, out_img.size)
+            return out_img
+        
+    except FileNotFoundError:
+        logger.error("Image file does not exist: %s", path)
+        return None
     except Exception as e:
         logger.error(f"Error opening image {path}: {type(e).__name__}: {e}")
         
@@ -95,71 +149,271 @@ def open_image_try(path):
         return None
 
 
-def apply_mode_to_image(img, target_size, mode, bgcolor):
+def _tile_layer(img, size):
+    """
+    Repeat an image over an area with a logarithmic number of copies.
+    
+    The first tile is copied as is and the filled region is then doubled,
+    first along a row and then down the columns, with plain (unmasked)
+    pastes; edge tiles are clipped by the area bounds.
+    
+    Args:
+        img: Tile image
+        size: Area (width, height)
+        
+    Returns:
+        PIL.Image: Tiled image of the given size, in img's mode
+    """
+    tw, th = size
+    layer = Image.new(img.mode, (tw, th))
+    layer.paste(img, (0, 0))
+    filled = img.width
+    while filled < tw:
+        layer.paste(layer.crop((0, 0, filled, img.height)), (filled, 0))
+        filled *= 2
+    filled = img.height
+    while filled < th:
+        layer.paste(layer.crop((0, 0, tw, filled)), (0, filled))
+        filled *= 2
+    return layer
+
+
+def apply_mode_to_image(img, target_size, mode, bgcolor, resample=Image.LANCZOS):
     """
     Apply display mode to an image.
     
+    Opaque (RGB) images on an opaque background give an RGB result; an
+    alpha channel is kept only when the image or the background has one.
+    
     Args:
-        img: PIL Image
+        img: PIL Image (RGB or RGBA)
         target_size: Target (width, height)
         mode: Display mode (fill, fit, stretch, center, tile)
         bgcolor: Background color as RGBA tuple
+        resample: Resampling filter for scaled modes (LANCZOS by default;
+            draft previews use a cheaper one)
         
     Returns:
         PIL.Image: Processed image
     """
     tw, th = target_size
-    logger.debug(f"Applying mode '{mode}' to image {img.size} -> {target_size}")
+    logger.debug("Applying mode '%s' to image %s -> %s", mode, img.size, target_size)
+    
+    # Opaque sources are copied without a mask
+    mask = img if img.mode == 'RGBA' else None
+    if mask is None and bgcolor[3] == 255:
+        out_mode, bgcolor = 'RGB', bgcolor[:3]
+    else:
+        out_mode = 'RGBA'
     
     if mode == 'fill':
         # Crop to fill entire area
-        result = ImageOps.fit(img, (tw, th), method=Image.LANCZOS)
+        result = ImageOps.fit(img, (tw, th), method=resample)
         
     elif mode == 'fit':
         # Scale to fit within area, maintaining aspect ratio
         img_copy = img.copy()
-        img_copy.thumbnail((tw, th), Image.LANCZOS)
-        out = Image.new('RGBA', (tw, th), bgcolor)
-        out.paste(img_copy, ((tw - img_copy.width) // 2, (th - img_copy.height) // 2), img_copy)
+        # reducing_gap=None: an exact resize, as for RGBA sources (Pillow
+        # resizes those premultiplied without reduce())
+        img_copy.thumbnail((tw, th), resample, reducing_gap=None)
+        out = Image.new(out_mode, (tw, th), bgcolor)
+        out.paste(img_copy, ((tw - img_copy.width) // 2, (th - img_copy.height) // 2),
+                  img_copy if mask else None)
         result = out
         
     elif mode == 'stretch':
         # Stretch to exact size (may distort)
-        result = img.resize((tw, th), Image.LANCZOS)
+        result = img.resize((tw, th), resample)
         
     elif mode == 'center':
         # Center image without scaling
-        out = Image.new('RGBA', (tw, th), bgcolor)
+        out = Image.new(out_mode, (tw, th), bgcolor)
         x = (tw - img.width) // 2
         y = (th - img.height) // 2
-        out.paste(img, (x, y), img)
+        out.paste(img, (x, y), mask)
         result = out
         
     elif mode == 'tile':
-        # Tile image to fill area
-        out = Image.new('RGBA', (tw, th), bgcolor)
-        for y in range(0, th, img.height):
-            for x in range(0, tw, img.width):
-                out.paste(img, (x, y), img)
-        result = out
+        # Tile image to fill area. The background is uniform, so blending
+        # one tile onto it and repeating the result gives the same pixels
+        # as blending every tile
+        if mask is None and out_mode == img.mode:
+            tile = img
+        else:
+            tile = Image.new(out_mode, img.size, bgcolor)
+            tile.paste(img, (0, 0), mask)
+        result = _tile_layer(tile, (tw, th))
         
     else:
         logger.warning(f"Unknown mode '{mode}', using 'fill' as fallback")
-        result = ImageOps.fit(img, (tw, th), method=Image.LANCZOS)
+        result = ImageOps.fit(img, (tw, th), method=resample)
     
-    logger.debug(f"Result image size: {result.size}")
+    logger.debug("Result image size: %s", result.size)
     return result
 
 
-def add_monitor_numbers(image, monitor_positions, original_size, position='top-left'):
+# Fonts tried for monitor labels, in order
+_EMBEDDED_FONT_PATH = Path(__file__).parent.parent / "fonts" / "DejaVuSans-Bold.ttf"
+_FONT_PATHS = [
+    str(_EMBEDDED_FONT_PATH),  # Embedded font (preferred)
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+    "/System/Library/Fonts/Helvetica.ttc",  # macOS
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Non-bold fallback
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+]
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_font_path():
+    """Find the label font once per process."""
+    if not _EMBEDDED_FONT_PATH.exists():
+        logger.warning(f"Embedded font not found at {_EMBEDDED_FONT_PATH}")
+    for font_path in _FONT_PATHS:
+        if os.path.exists(font_path):
+            try:
+                ImageFont.truetype(font_path, 24)
+                logger.info(f"✓ Using font: {font_path}")
+                return font_path
+            except Exception as e:
+                logger.debug(f"Could not load font {font_path}: {e}")
+    logger.warning("⚠️ No TrueType font found, using default (text will be small)")
+    return None
+
+
+@functools.lru_cache(maxsize=16)
+def _load_font(font_size):
+    """
+    Load the label font at a size.
+    
+    Returns:
+        tuple: (font, font_size) where font_size is adjusted for the tiny
+            default font if no TrueType font is available
+    """
+    font_path = _resolve_font_path()
+    if font_path is not None:
+        try:
+            return ImageFont.truetype(font_path, font_size), font_size
+        except Exception as e:
+            logger.warning(f"Error loading font: {e}, using default")
+    # Adjust font_size for calculations since default font is tiny
+    return ImageFont.load_default(), 20
+
+
+def _label_font_size(image_size):
+    """Get the label font size for an image, 4% of its average dimension."""
+    avg_dimension = (image_size[0] + image_size[1]) / 2
+    return max(24, min(int(avg_dimension * 0.04), 72))  # Between 24 and 72 pixels
+
+
+@functools.lru_cache(maxsize=64)
+def _label_sprite(font_size, text):
+    """
+    Render a monitor label: white text with a shadow on a rounded black box.
+    
+    Args:
+        font_size: Requested font size
+        text: Label text
+        
+    Returns:
+        tuple: (sprite RGB image, mask, text offset) where the offset is the
+            text position relative to the sprite's top-left corner
+    """
+    font, font_size = _load_font(font_size)
+    
+    # Measurements of glyphs are unreliable across fonts: use conservative
+    # estimates based on font_size
+    text_width = int(font_size * 0.7 * len(text))  # Scale with number of digits
+    text_height = int(font_size * 1.0)
+    # Background padding - generous to center text properly
+    pad = int(font_size * 0.5)
+    box = (0, 0, text_width + pad * 2, text_height + pad * 2)
+    size = (box[2] + 1, box[3] + 1)
+    
+    sprite = Image.new('RGB', size, (0, 0, 0))
+    mask = Image.new('L', size, 0)
+    mask_draw = ImageDraw.Draw(mask)
+    mask_draw.rounded_rectangle(box, radius=int(font_size * 0.3), fill=255)
+    
+    draw = ImageDraw.Draw(sprite)
+    old_max_pixels = Image.MAX_IMAGE_PIXELS
+    try:
+        for attempt in range(2):
+            try:
+                draw.text((pad + 1, pad + 1), text, font=font, fill=(0, 0, 0))
+                draw.text((pad, pad), text, font=font, fill=(255, 255, 255))
+                # Glyphs overflowing the box are kept too
+                mask_draw.text((pad + 1, pad + 1), text, font=font, fill=255)
+                mask_draw.text((pad, pad), text, font=font, fill=255)
+                break
+            except Image.DecompressionBombError as e:
+                # WORKAROUND: Some TrueType fonts trigger false positives
+                if attempt:
+                    raise
+                logger.warning(f"DecompressionBombError drawing text '{text}', retrying without limit: {e}")
+                Image.MAX_IMAGE_PIXELS = None
+    except Exception as e:
+        logger.error(f"Error drawing label '{text}': {e}")
+    finally:
+        Image.MAX_IMAGE_PIXELS = old_max_pixels
+    return sprite, mask, (pad, pad)
+
+
+def _draw_clamped_label(image, font_size, text, text_x, text_y):
+    """
+    Draw a label whose box crosses the image edge.
+    
+    The box is clamped to the image before its rounded corners are drawn,
+    so it cannot come from the cached sprite.
+    """
+    font, font_size = _load_font(font_size)
+    text_width = int(font_size * 0.7 * len(text))
+    text_height = int(font_size * 1.0)
+    pad = int(font_size * 0.5)
+    bg_rect = [
+        max(0, text_x - pad),
+        max(0, text_y - pad),
+        min(image.width, text_x - pad + text_width + pad * 2),
+        min(image.height, text_y - pad + text_height + pad * 2),
+    ]
+    if bg_rect[2] - bg_rect[0] <= 0 or bg_rect[3] - bg_rect[1] <= 0:
+        logger.debug("Label '%s' outside the image, skipping", text)
+        return
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle(bg_rect, radius=int(font_size * 0.3), fill=(0, 0, 0, 180))
+    old_max_pixels = Image.MAX_IMAGE_PIXELS
+    try:
+        for attempt in range(2):
+            try:
+                draw.text((text_x + 1, text_y + 1), text, font=font, fill=(0, 0, 0, 100))
+                draw.text((text_x, text_y), text, font=font, fill=(255, 255, 255, 255))
+                break
+            except Image.DecompressionBombError:
+                # Same font workaround as in _label_sprite
+                if attempt:
+                    raise
+                Image.MAX_IMAGE_PIXELS = None
+    except Exception as e:
+        logger.error(f"Error drawing label '{text}': {e}")
+    finally:
+        Image.MAX_IMAGE_PIXELS = old_max_pixels
+
+
+def add_monitor_numbers(image, monitor_positions, original_size, position='top-left', in_place=False):
     """
     Add monitor numbers to the preview image.
     
+    Labels are cached sprites pasted onto the image; fonts are resolved and
+    loaded once per process.
+    
     Args:
         image: PIL Image to draw on (potentially scaled)
         monitor_positions: List of (x, y, w, h) tuples for each monitor (in original coordinates)
         original_size: Tuple of (original_width, original_height) before scaling
         position: Position for the label ('top-left' or 'top-right')
+        in_place: Draw on image itself instead of a copy; only for callers
+            that own the image
         
     Returns:
         PIL.Image: Image with monitor numbers drawn
@@ -169,179 +423,395 @@ def add_monitor_numbers(image, monitor_positions, original_size, position='top-l
     scale_ratio_h = image.height / original_size[1]
     scale_ratio = min(scale_ratio_w, scale_ratio_h)  # Use minimum to preserve aspect ratio
     
-    logger.debug(f"Adding monitor numbers, original_size={original_size}, "
-                f"current_size={image.size}, scale_ratio={scale_ratio:.3f}, position={position}")
-    
-    # Create a copy to draw on
-    img_with_numbers = image.copy()
-    draw = ImageDraw.Draw(img_with_numbers)
-    
-    # FIXED: Calculate font size based on CURRENT (scaled) image dimensions
-    # This way we get consistent visual size relative to what user sees
-    avg_dimension = (image.width + image.height) / 2
-    font_size = int(avg_dimension * 0.04)  # 4% of average dimension
-    font_size = max(24, min(font_size, 72))  # Between 24 and 72 pixels
-    
-    logger.debug(f"Font size: {font_size}px (based on current image size {image.size})")
-
-    # Embedded font path - relative to this file
-    embedded_font_path = Path(__file__).parent.parent / "fonts" / "DejaVuSans-Bold.ttf"
-
-    logger.debug(f"Looking for embedded font...")
-    logger.debug(f"  __file__ = {__file__}")
-    logger.debug(f"  parent = {Path(__file__).parent}")
-    logger.debug(f"  parent.parent = {Path(__file__).parent.parent}")
-    logger.debug(f"  embedded_font_path = {embedded_font_path}")
-    logger.debug(f"  exists = {embedded_font_path.exists()}")
-    
-    if embedded_font_path.exists():
-        logger.debug(f"  ✓ Font file found, size: {embedded_font_path.stat().st_size} bytes")
-    else:
-        logger.warning(f"  ✗ Embedded font not found at {embedded_font_path}")
-        # List what's actually in parent.parent
-        try:
-            parent_contents = list(Path(__file__).parent.parent.iterdir())
-            logger.debug(f"  Contents of {Path(__file__).parent.parent}:")
-            for item in parent_contents[:10]:  # Limit to first 10 items
-                logger.debug(f"    - {item.name}")
-        except Exception as e:
-            logger.debug(f"  Could not list directory: {e}")
-    
-    # Try to use a good font, with embedded fallback
-    font = None
-    try:
-        font_paths = [
-            str(embedded_font_path),  # Embedded font (preferred)
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-            "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
-            "/System/Library/Fonts/Helvetica.ttc",  # macOS
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Non-bold fallback
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-        ]
-        
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                    logger.info(f"✓ Using font: {font_path} at size {font_size}")
-                    break
-                except Exception as e:
-                    logger.debug(f"Could not load font {font_path}: {e}")
-        
-        if font is None:
-            logger.warning("⚠️ No TrueType font found, using default (text will be small)")
-            font = ImageFont.load_default()
-            # Adjust font_size for calculations since default font is tiny
-            font_size = 20
-            
-    except Exception as e:
-        logger.warning(f"Error loading font: {e}, using default")
-        font = ImageFont.load_default()
-        font_size = 20
+    target = image if in_place else image.copy()
+    # Calculate font size based on CURRENT (scaled) image dimensions, so the
+    # labels have a consistent size relative to what the user sees
+    font_size = _label_font_size(image.size)
     
-    # Draw number for each monitor
     for i, (x, y, w, h) in enumerate(monitor_positions):
         # Scale position according to preview scale
         x_scaled = int(x * scale_ratio)
         y_scaled = int(y * scale_ratio)
         w_scaled = int(w * scale_ratio)
-        h_scaled = int(h * scale_ratio)
         
         # Monitor number (1-indexed for users)
-        text = str(i + 1)
-        
-        # FIXED: Don't trust any font measurement methods - they're buggy
-        # Use conservative estimates based on font_size
-        text_width = int(font_size * 0.7 * len(text))  # Scale with number of digits
-        text_height = int(font_size * 1.0)
-        
-        logger.debug(f"Monitor {i+1}: text='{text}', estimated_width={text_width}, estimated_height={text_height}, font_size={font_size}")
-        
-        # Padding around text (proportional to font size)
-        padding = int(font_size * 0.6)
+        sprite, mask, (text_dx, text_dy) = _label_sprite(font_size, str(i + 1))
+        padding = int(_load_font(font_size)[1] * 0.6)
         
         # Position based on preference (top-left by default)
         if position == 'top-right':
-            text_x = x_scaled + w_scaled - text_width - padding * 2
+            text_x = x_scaled + w_scaled - (sprite.width - 1 - text_dx * 2) - padding * 2
         else:  # top-left
             text_x = x_scaled + padding
-        
         text_y = y_scaled + padding
         
-        # Background padding - generous to center text properly
-        bg_padding_h = int(font_size * 0.5)  # Horizontal padding
-        bg_padding_v = int(font_size * 0.5)  # Vertical padding (same as horizontal)
-        
-        # Calculate background rectangle dimensions FIRST
-        bg_width = text_width + (bg_padding_h * 2)
-        bg_height = text_height + (bg_padding_v * 2)
-        
-        # Then calculate position (top-left corner of background)
-        bg_x = text_x - bg_padding_h
-        bg_y = text_y - bg_padding_v
-        
-        # Build rectangle as [x1, y1, x2, y2]
-        bg_rect = [
-            bg_x,
-            bg_y,
-            bg_x + bg_width,
-            bg_y + bg_height
-        ]
-        
-        # Clamp to image boundaries
-        bg_rect[0] = max(0, bg_rect[0])
-        bg_rect[1] = max(0, bg_rect[1])
-        bg_rect[2] = min(image.width, bg_rect[2])
-        bg_rect[3] = min(image.height, bg_rect[3])
-        
-        # Validate final dimensions
-        final_width = bg_rect[2] - bg_rect[0]
-        final_height = bg_rect[3] - bg_rect[1]
-        
-        # Skip if rectangle is invalid
-        if final_width <= 0 or final_height <= 0:
-            logger.warning(f"Monitor {i+1}: Invalid background rectangle, skipping")
+        # The sprite's last row and column lie just past the box, as
+        # rounded_rectangle includes its end coordinates
+        box_x, box_y = text_x - text_dx, text_y - text_dy
+        if box_x < 0 or box_y < 0 or box_x + sprite.width - 1 > image.width \
+                or box_y + sprite.height - 1 > image.height:
+            _draw_clamped_label(target, font_size, str(i + 1), text_x, text_y)
             continue
+        target.paste(sprite, (box_x, box_y), mask)
+    
+    return target
+
+
+class _Composition:
+    """Canvas retained between compositions, with the tile last rendered for each monitor."""
+
+    def __init__(self, layout, size):
+        self.layout = layout
+        self.canvas = Image.new('RGB', size, DEFAULT_OPTIONS['background'])
+        self.lock = threading.Lock()
+        self.tiles = {}  # monitor index -> (tile key, tile image, use_mask)
+
+
+# Last composition per target ('full' or preview size), reused when only
+# some monitors change
+_compositions = {}
+_compositions_lock = threading.Lock()
+
+# Worker pool rendering dirty tiles concurrently (Pillow releases the GIL
+# while decoding and resampling)
+_tile_workers = min(os.cpu_count() or 1, 8)
+_tile_executor = None
+_tile_executor_lock = threading.Lock()
+
+
+def set_tile_workers(workers):
+    """
+    Set how many monitor tiles may be rendered in parallel.
+    
+    Args:
+        workers: Number of worker threads (1 renders serially)
+    """
+    global _tile_workers, _tile_executor
+    workers = max(1, int(workers))
+    with _tile_executor_lock:
+        if workers != _tile_workers and _tile_executor is not None:
+            _tile_executor.shutdown(wait=False)
+            _tile_executor = None
+        _tile_workers = workers
+    logger.debug("Tile workers set to %s", workers)
+
+
+def _get_tile_executor():
+    global _tile_executor
+    with _tile_executor_lock:
+        if _tile_executor is None:
+            _tile_executor = ThreadPoolExecutor(
+                max_workers=_tile_workers,
+                thread_name_prefix='multiwall-tile'
+            )
+        return _tile_executor
+
+
+def clear_composition_cache():
+    """Drop the retained canvases and rendered tiles."""
+    with _compositions_lock:
+        _compositions.clear()
+
+
+def _rects_intersect(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def tile_key(state, size):
+    """
+    Get the key identifying the tile rendered for a monitor state.
+    
+    Args:
+        state: Monitor state (file, mode, background)
+        size: Tile size (width, height)
         
-        logger.debug(f"Monitor {i+1}: bg_rect={bg_rect}, text_pos=({text_x},{text_y}), "
-                    f"text_size=({text_width}x{text_height}), final_bg=({final_width}x{final_height})")
+    Returns:
+        tuple: (file identity, mode, background, size)
+    """
+    file = state.get('file')
+    identity = file_identity(file) if file else None
+    return (
+        identity,
+        state.get('mode', DEFAULT_OPTIONS['mode']),
+        state.get('background', DEFAULT_OPTIONS['background']),
+        tuple(size),
+    )
+
+
+def _scaled_source_size(file, scale):
+    """
+    Get a source's size scaled by the preview scale, from its header.
+    
+    Returns:
+        tuple: (width, height), or None if the header cannot be read
+    """
+    try:
+        with Image.open(file) as src:  # Reads the header only
+            return (max(1, round(src.width * scale)), max(1, round(src.height * scale)))
+    except Exception:
+        return None
+
+
+def _shown_unscaled(file, mode, size, scale):
+    """
+    Check whether a preview shows the source scaled by the preview scale only.
+    
+    True for center and tile modes, and for fit mode when the source is no
+    larger than the full-size tile: fit never enlarges, so the full render
+    shows such a source at native size.
+    
+    Args:
+        file: Source image path
+        mode: Display mode
+        size: Preview tile size (width, height)
+        scale: Preview scale
+    """
+    if mode in ('center', 'tile'):
+        return True
+    if mode != 'fit':
+        return False
+    need = _scaled_source_size(file, scale)
+    # One pixel of slack for the rounding of scaled monitor rectangles
+    return need is not None and need[0] <= size[0] + 1 and need[1] <= size[1] + 1
+
+
+def render_tile(index, state, size, scale=None):
+    """
+    Render the tile for a single monitor.
+    
+    Args:
+        index: Monitor index (for logging)
+        state: Monitor state (file, mode, background)
+        size: Tile size (width, height)
+        scale: Optional preview scale; the source is then decoded at reduced
+            size instead of full resolution
         
-        # Draw background rectangle
-        draw.rounded_rectangle(
-            bg_rect,
-            radius=int(font_size * 0.3),
-            fill=(0, 0, 0, 180)  # Semi-transparent black, no outline
-        )
+    Returns:
+        tuple: (tile image, use_mask) where use_mask tells whether the tile
+            has transparency and must be pasted with its own alpha as mask
+    """
+    file = state.get('file')
+    mode = state.get('mode', DEFAULT_OPTIONS['mode'])
+    bcolor = state.get('background', DEFAULT_OPTIONS['background'])
+    bg_rgba = ImageColor.getcolor(bcolor, 'RGBA')
+    
+    logger.debug("Processing monitor %s: mode=%s, bg=%s", index, mode, bcolor)
+    
+    img = None
+    if file and os.path.exists(file):
+        cache = get_image_cache()
+        if scale is None:
+            img = cache.get(file, open_image_try)
+        elif _shown_unscaled(file, mode, size, scale):
+            # Shown at native size: shrink the source by the preview scale itself
+            img = cache.get(file, lambda p: open_image_try(p, scale=scale),
+                            variant=('scale', scale))
+        else:
+            img = cache.get(file, lambda p: open_image_try(p, draft_size=size),
+                            variant=('draft', tuple(size)))
+        if img:
+            logger.debug("Monitor %s: Image loaded from %s", index, os.path.basename(file))
+        else:
+            logger.warning("Monitor %s: Could not load image from %s", index, file)
+    
+    if img:
+        # Apply display mode
+        with span('apply_mode', mode=mode):
+            tile = apply_mode_to_image(img, size, mode, bg_rgba)
+        return tile, tile.mode == 'RGBA'
+    
+    # Fill with background color if no image
+    if file:
+        logger.warning("Monitor %s: Using background color (image load failed)", index)
+    else:
+        logger.debug("Monitor %s: Using background color (no image selected)", index)
+    return Image.new('RGB', size, bg_rgba[:3]), False
+
+
+def _draft_source(file, mode, size, scale):
+    """
+    Get an already decoded source for a draft tile, without decoding.
+    
+    Returns:
+        PIL.Image: Cached source (rescaled when shown at native size) or None
+    """
+    cache = get_image_cache()
+    unscaled = _shown_unscaled(file, mode, size, scale)
+    if unscaled:
+        img = cache.peek(file, ('scale', scale))
+    else:
+        img = cache.peek(file, ('draft', tuple(size)))
+    if img is not None:
+        return img
+    
+    # Fall back to a decode made for another mode or size
+    if unscaled:
+        need = _scaled_source_size(file, scale)
+        if need is None:
+            return None
+        img = cache.peek_any(file, need)
+        if img is not None and img.size != need:
+            img = img.resize(need, DRAFT_RESAMPLE)
+        return img
+    return cache.peek_any(file, size)
+
+
+def render_draft_tile(index, state, size, scale):
+    """
+    Render a monitor tile quickly for a draft preview.
+    
+    Only sources already in the image cache are used, resampled with a
+    cheap filter; nothing is decoded.
+    
+    Args:
+        index: Monitor index (for logging)
+        state: Monitor state (file, mode, background)
+        size: Tile size (width, height)
+        scale: Preview scale
         
-        # Draw white text with slight shadow for better visibility
-        try:
-            # Try normal rendering first
-            draw.text((text_x + 1, text_y + 1), text, font=font, fill=(0, 0, 0, 100))
-            draw.text((text_x, text_y), text, font=font, fill=(255, 255, 255, 255))
-            logger.debug(f"Monitor {i+1} label drawn successfully")
-            
-        except Image.DecompressionBombError as e:
-            # WORKAROUND: Some TrueType fonts trigger false positives
-            # Only disable the check if we get this specific error
-            logger.warning(f"DecompressionBombError drawing text '{text}', retrying without limit: {e}")
-            
-            old_max_pixels = Image.MAX_IMAGE_PIXELS
-            Image.MAX_IMAGE_PIXELS = None
-            
-            try:
-                draw.text((text_x + 1, text_y + 1), text, font=font, fill=(0, 0, 0, 100))
-                draw.text((text_x, text_y), text, font=font, fill=(255, 255, 255, 255))
-                logger.debug(f"Monitor {i+1} label drawn successfully (with workaround)")
-            except Exception as e2:
-                logger.error(f"Failed to draw text for monitor {i+1} even with workaround: {e2}")
-            finally:
-                Image.MAX_IMAGE_PIXELS = old_max_pixels
-                
-        except Exception as e:
-            logger.error(f"Error drawing text for monitor {i+1}: {e}")
+    Returns:
+        tuple: (tile image, use_mask, complete) where complete is False if
+            the source was not cached and only the background was drawn
+    """
+    file = state.get('file')
+    mode = state.get('mode', DEFAULT_OPTIONS['mode'])
+    bg_rgba = ImageColor.getcolor(state.get('background', DEFAULT_OPTIONS['background']), 'RGBA')
+    
+    img = _draft_source(file, mode, size, scale) if file else None
+    if img is not None:
+        with span('apply_mode_draft', mode=mode):
+            tile = apply_mode_to_image(img, size, mode, bg_rgba, resample=DRAFT_RESAMPLE)
+        return tile, tile.mode == 'RGBA', True
+    logger.debug("Monitor %s: source not cached, drafting background only", index)
+    return Image.new('RGB', size, bg_rgba[:3]), False, not file
+
+
+def _scale_rects(rects, ratio):
+    """Scale monitor rectangles, keeping adjacent monitors edge to edge."""
+    scaled = []
+    for (x, y, w, h) in rects:
+        sx, sy = int(x * ratio), int(y * ratio)
+        sw = max(1, int((x + w) * ratio) - sx)
+        sh = max(1, int((y + h) * ratio) - sy)
+        scaled.append((sx, sy, sw, sh))
+    return scaled
+
+
+def _compose_rects(target, norm, size, states, scale=None, draft=False, labels=None):
+    """
+    Compose tiles onto the canvas retained for target.
+    
+    Args:
+        target: Key of the retained composition ('full' or preview key)
+        norm: Normalized (x, y, w, h) rectangle for each monitor
+        size: Canvas size (width, height)
+        states: Dict of monitor states
+        scale: Preview scale passed to render_tile, or None for full size
+        draft: Render tiles with render_draft_tile
+        labels: Optional (monitor rectangles, original size) to draw monitor
+            numbers with, kept on the retained canvas
+        
+    Returns:
+        PIL.Image: The retained canvas, or None for a draft in which some
+            monitor's source is not decoded yet
+    """
+    # Reuse the retained canvas when the layout is unchanged
+    layout = (tuple(norm), tuple(size))
+    with _compositions_lock:
+        comp = _compositions.get(target)
+        if comp is None or comp.layout != layout:
+            logger.debug("Layout changed, starting a new canvas for %s", target)
+            comp = _Composition(layout, size)
+            _compositions[target] = comp
+
+    with comp.lock:
+        return _update_composition(comp, norm, states, scale, draft, labels)
+
+
+def _update_composition(comp, norm, states, scale, draft=False, labels=None):
+    """Re-render dirty tiles and re-blit them onto comp's canvas."""
+    # Re-render only the monitors whose tile key changed
+    keys = [tile_key(states.get(str(i), {}), (w, h)) for i, (x, y, w, h) in enumerate(norm)]
+    dirty = {i for i, key in enumerate(keys) if comp.tiles.get(i, (None,))[0] != key}
+    logger.debug("Dirty monitors: %s of %s", sorted(dirty), len(norm))
+    
+    if draft:
+        # Cheap enough to run inline; placeholder tiles keep no key so they
+        # are drafted again once their source is cached
+        for i in sorted(dirty):
+            tile, use_mask, complete = render_draft_tile(
+                i, states.get(str(i), {}), norm[i][2:], scale
+            )
+            comp.tiles[i] = (keys[i] if complete else None, tile, use_mask)
+    elif len(dirty) > 1 and _tile_workers > 1:
+        executor = _get_tile_executor()
+        futures = {
+            i: executor.submit(render_tile, i, states.get(str(i), {}), norm[i][2:], scale)
+            for i in dirty
+        }
+        # Collect in monitor order so the output does not depend on timing
+        for i in sorted(dirty):
+            tile, use_mask = futures[i].result()
+            comp.tiles[i] = (keys[i], tile, use_mask)
+    else:
+        for i in sorted(dirty):
+            tile, use_mask = render_tile(i, states.get(str(i), {}), norm[i][2:], scale)
+            comp.tiles[i] = (keys[i], tile, use_mask)
+
+    # Overlapping monitors must be repainted together to keep paint order
+    repaint = set(dirty)
+    grew = True
+    while grew:
+        grew = False
+        for j, rect in enumerate(norm):
+            if j not in repaint and any(_rects_intersect(rect, norm[k]) for k in repaint):
+                repaint.add(j)
+                grew = True
+
+    bg_default = ImageColor.getcolor(DEFAULT_OPTIONS['background'], 'RGB')
+    with span('paste', tiles=len(repaint)):
+        for i in sorted(repaint):
+            x, y, w, h = norm[i]
+            comp.canvas.paste(bg_default, (x, y, x + w, y + h))
+        for i in sorted(repaint):
+            x, y, w, h = norm[i]
+            _, tile, use_mask = comp.tiles[i]
+            comp.canvas.paste(tile, (x, y), tile if use_mask else None)
+            logger.debug("Monitor %s: Image pasted at (%s, %s)", i, x, y)
     
-    return img_with_numbers
+    # Repainted tiles may cover labels of any monitor: paste them all again
+    if labels and repaint:
+        with span('monitor_numbers'):
+            add_monitor_numbers(comp.canvas, labels[0], labels[1], in_place=True)
+
+    # A draft missing a source would flash that monitor's bare background;
+    # the canvas is kept for the next draft but not shown
+    if draft and any(comp.tiles[i][0] is None for i in range(len(norm))):
+        logger.debug("Draft incomplete, not delivering it")
+        return None
+    return comp.canvas
+
+
+def monitor_rects(monitors):
+    """
+    Get the (x, y, width, height) rectangle of each GDK monitor.
+    
+    Must be called from the GTK main thread.
+    
+    Args:
+        monitors: List of GDK monitor objects
+        
+    Returns:
+        list: (x, y, width, height) tuples
+    """
+    rects = []
+    for i, m in enumerate(monitors):
+        geom = m.get_geometry()
+        rects.append((geom.x, geom.y, geom.width, geom.height))
+        logger.debug("Monitor %s geometry: %s, %s, %sx%s", i, geom.x, geom.y, geom.width, geom.height)
+    return rects
 
 
 def compose_image(monitors, states, scale_preview=None):
@@ -354,83 +824,74 @@ def compose_image(monitors, states, scale_preview=None):
         scale_preview: Optional max dimension for preview scaling
         
     Returns:
-        PIL.Image: Composed wallpaper image
+        PIL.Image: Composed wallpaper image. The full-resolution canvas is
+            retained for the next call and must not be modified by callers.
     """
-    logger.info("=== Starting image composition ===")
+    return compose_rects(monitor_rects(monitors), states, scale_preview)
+
+
+def compose_rects(rects, states, scale_preview=None, draft=False):
+    """
+    Compose the final wallpaper image from a monitor layout.
     
-    # Get monitor geometries
-    rects = []
-    for i, m in enumerate(monitors):
-        geom = m.get_geometry()
-        rects.append((geom.x, geom.y, geom.width, geom.height))
-        logger.debug(f"Monitor {i} geometry: {geom.x}, {geom.y}, {geom.width}x{geom.height}")
+    Does not touch GDK, so it can run on worker threads and headless.
+    
+    Args:
+        rects: List of (x, y, width, height) monitor rectangles
+        states: Dict of monitor states (image, mode, background)
+        scale_preview: Optional max dimension for preview scaling
+        draft: With scale_preview, compose a fast low-quality preview from
+            already decoded sources only (see render_draft_tile)
+        
+    Returns:
+        PIL.Image: Composed wallpaper image, or None for a draft when a
+            source is not decoded yet. The canvas (full-resolution or
+            preview, with its monitor numbers) is retained for the next call
+            and must not be modified by callers.
+    """
+    logger.debug("=== Starting image composition ===")
     
     # Normalize coordinates
     min_x = min(r[0] for r in rects)
     min_y = min(r[1] for r in rects)
     norm = [(x - min_x, y - min_y, w, h) for (x, y, w, h) in rects]
-    logger.debug(f"Normalized coordinates, offset: ({min_x}, {min_y})")
+    logger.debug("Normalized coordinates, offset: (%s, %s)", min_x, min_y)
     
     # Calculate total canvas size
     total_w = max(x + w for (x, y, w, h) in norm)
     total_h = max(y + h for (x, y, w, h) in norm)
-    logger.info(f"Total canvas size: {total_w}x{total_h}")
-
-    # Create canvas
-    canvas = Image.new('RGBA', (total_w, total_h), DEFAULT_OPTIONS['background'])
-
-    # Process each monitor
-    for i, (x, y, w, h) in enumerate(norm):
-        st = states.get(str(i), {})
-        file = st.get('file')
-        mode = st.get('mode', DEFAULT_OPTIONS['mode'])
-        bcolor = st.get('background', DEFAULT_OPTIONS['background'])
-        bg_rgba = ImageColor.getcolor(bcolor, 'RGBA')
-        
-        logger.debug(f"Processing monitor {i}: mode={mode}, bg={bcolor}")
-        
-        img = None
-        if file and os.path.exists(file):
-            img = open_image_try(file)
-            if img:
-                logger.info(f"Monitor {i}: Image loaded from {os.path.basename(file)}")
-            else:
-                logger.warning(f"Monitor {i}: Could not load image from {file}")
-        
-        if img:
-            # Apply display mode
-            img2 = apply_mode_to_image(img, (w, h), mode, bg_rgba)
-            canvas.paste(img2, (x, y), img2)
-            logger.debug(f"Monitor {i}: Image pasted at ({x}, {y})")
-        else:
-            # Fill with background color if no image
-            filler = Image.new('RGBA', (w, h), bg_rgba)
-            canvas.paste(filler, (x, y))
-            if file:
-                logger.warning(f"Monitor {i}: Using background color (image load failed)")
-            else:
-                logger.debug(f"Monitor {i}: Using background color (no image selected)")
+    logger.debug("Total canvas size: %sx%s", total_w, total_h)
 
     # Store original size before scaling
     original_size = (total_w, total_h)
 
-    # Scale for preview if requested
+    # Preview: render every tile directly at preview resolution
     if scale_preview:
         ratio = min(scale_preview / total_w, scale_preview / total_h)
+        if draft:
+            # Drafts never render at more than full size
+            scale = min(ratio, 1.0)
+            draft_size = (max(1, int(total_w * scale)), max(1, int(total_h * scale)))
+            with span('compose_draft'):
+                return _compose_rects(
+                    ('draft', scale_preview), _scale_rects(norm, scale), draft_size, states,
+                    scale=scale, draft=True, labels=(norm, original_size) if ratio < 1 else None
+                )
         if ratio < 1:
             new_w, new_h = int(total_w * ratio), int(total_h * ratio)
-            logger.debug(f"Scaling preview to {new_w}x{new_h} (ratio: {ratio:.2f})")
-            scaled = canvas.resize((new_w, new_h), Image.LANCZOS)
-            
-            # Add monitor numbers to the scaled preview with original size for reference
-            scaled_with_numbers = add_monitor_numbers(
-                scaled, 
-                norm, 
-                original_size=original_size,
-                position='top-left'
-            )
-            
-            return scaled_with_numbers
+            logger.debug("Composing preview at %sx%s (ratio: %.2f)", new_w, new_h, ratio)
+            scaled_rects = _scale_rects(norm, ratio)
+            # Monitor numbers are drawn on the retained preview canvas,
+            # scaled from the original size
+            with span('compose_preview'):
+                return _compose_rects(
+                    ('preview', scale_preview), scaled_rects, (new_w, new_h), states,
+                    scale=ratio, labels=(norm, original_size)
+                )
     
-    logger.info(f"Composition complete: {canvas.size}")
+    with span('compose_full'):
+        canvas = _compose_rects('full', norm, original_size, states)
+    logger.debug("Composition complete: %s", canvas.size)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Image cache: %s", get_image_cache().stats())
     return canvas
\ No newline at end of file
@@ -1,4 +1,14 @@
+"""
+Configuration persistence for MultiWall.
+config.json is written atomically (temporary file, fsync, rename), so an
+interrupted write never leaves a truncated file. ConfigStore coalesces
+frequent changes and writes them from a background thread.
+"""
 import json
+import os
+import tempfile
+import threading
+import time
 from pathlib import Path
 from .logger import get_logger
 
@@ -13,13 +23,14 @@ DEFAULT_OPTIONS = {
     "background": "#000000"
 }
 
+# Changes within this window are written together
+SAVE_DELAY = 0.5
 
-def ensure_config_dir():
-    """Ensure configuration directory exists with correct permissions."""
+
+def ensure_config_dir(config_dir=CONFIG_DIR):
+    """Ensure configuration directory exists."""
     try:
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        CONFIG_DIR.chmod(0o755)
-        logger.debug(f"Config directory ensured: {CONFIG_DIR}")
+        config_dir.mkdir(parents=True, exist_ok=True)
         return True
     except Exception as e:
         logger.error(f"Error creating config directory: {e}")
@@ -51,37 +62,221 @@ def load_config():
     return {}
 
 
-def save_config(cfg):
+def get_int_option(cfg, key, minimum=0):
     """
-    Save configuration to JSON file.
+    Read an optional integer setting, ignoring malformed values.
     
     Args:
-        cfg: Configuration dictionary to save
+        cfg: Configuration dictionary
+        key: Setting name
+        minimum: Smallest accepted value
         
     Returns:
-        bool: True if saved successfully, False otherwise
+        int: The setting, or None if missing or invalid (defaults apply)
     """
-    if not ensure_config_dir():
-        logger.error("Could not create config directory")
-        return False
-    
+    value = cfg.get(key)
+    if value is None:
+        return None
     try:
-        # Convert to JSON with readable format
-        json_content = json.dumps(cfg, indent=2, ensure_ascii=False)
+        if isinstance(value, bool):
+            raise ValueError("boolean")
+        number = int(value)
+        if number < minimum:
+            raise ValueError(f"below {minimum}")
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Ignoring invalid value for '{key}': {value!r} ({e})")
+        return None
+    return number
+
+
+def serialize_config(cfg):
+    """Serialize a configuration the way it is stored in config.json."""
+    return json.dumps(cfg, indent=2, ensure_ascii=False)
+
+
+def write_atomic(path, content):
+    """
+    Replace a text file atomically.
+    
+    The content is written to a temporary file in the same directory,
+    flushed to disk and renamed over path.
+    
+    Args:
+        path: Destination file
+        content: Text to write
         
-        # Save to file
-        CONFIG_FILE.write_text(json_content, encoding='utf-8')
+    Raises:
+        OSError: If the file cannot be written
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}-", suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def _read_text(path):
+    try:
+        return Path(path).read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _write_config(path, content, current):
+    """
+    Write configuration content unless the file already holds it.
+    
+    Args:
+        path: Configuration file
+        content: Serialized configuration
+        current: Content known to be on disk (None if unknown or missing)
         
-        # Verify save was successful
-        if CONFIG_FILE.exists():
-            file_size = CONFIG_FILE.stat().st_size
-            logger.info(f"Configuration saved: {CONFIG_FILE} ({file_size} bytes)")
-            logger.debug(f"Saved {len(cfg.get('monitors', {}))} monitor configurations")
-            return True
-        else:
-            logger.error(f"File was not created: {CONFIG_FILE}")
-            return False
-            
+    Returns:
+        bool: True if the file holds content afterwards, False on error
+    """
+    if content == current:
+        logger.debug(f"Configuration unchanged: {path}")
+        return True
+    if not ensure_config_dir(path.parent):
+        logger.error("Could not create config directory")
+        return False
+    try:
+        write_atomic(path, content)
     except Exception as e:
         logger.error(f"Error saving configuration: {e}", exc_info=True)
-        return False
\ No newline at end of file
+        return False
+    logger.info(f"Configuration saved: {path}")
+    return True
+
+
+def save_config(cfg, path=None):
+    """
+    Save configuration to JSON file, atomically and only if it changed.
+    
+    For one-shot saves; the app uses ConfigStore.
+    
+    Args:
+        cfg: Configuration dictionary to save
+        path: Destination (default: CONFIG_FILE)
+        
+    Returns:
+        bool: True if saved (or already up to date), False otherwise
+    """
+    path = Path(path) if path else CONFIG_FILE
+    return _write_config(path, serialize_config(cfg), _read_text(path))
+
+
+class ConfigStore:
+    """
+    Debounced configuration writer.
+    
+    save() only records the latest configuration; a background thread
+    writes it once no change has arrived for `delay` seconds. Content equal
+    to what is already on disk is not written again.
+    """
+    
+    def __init__(self, path=None, delay=SAVE_DELAY):
+        """
+        Args:
+            path: Configuration file (default: CONFIG_FILE)
+            delay: Seconds to wait for further changes before writing
+        """
+        self.path = Path(path) if path else CONFIG_FILE
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._pending = None  # (sequence, content) waiting to be written
+        self._deadline = 0.0
+        self._sequence = 0
+        self._write_lock = threading.Lock()
+        self._written = None  # (sequence, content) last on disk
+        self._thread = None
+        self._closed = False
+    
+    def save(self, cfg):
+        """
+        Schedule a configuration to be written.
+        
+        The configuration is serialized immediately, so later changes to
+        cfg are not picked up.
+        
+        Args:
+            cfg: Configuration dictionary
+        """
+        content = serialize_config(cfg)
+        with self._cond:
+            if self._closed:
+                logger.debug("Configuration store closed, saving synchronously")
+                self._sequence += 1
+                self._write(self._sequence, content)
+                return
+            self._sequence += 1
+            self._pending = (self._sequence, content)
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='multiwall-config', daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+    
+    def flush(self):
+        """Write the pending configuration now, if any (blocks until written)."""
+        with self._cond:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            self._write(*pending)
+    
+    def close(self):
+        """Write any pending configuration and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def _run(self):
+        """Writer thread: wait for the debounce window, then write."""
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0 and not self._closed:
+                    # A newer save() moves the deadline; re-check after waking
+                    self._cond.wait(remaining)
+                    continue
+                pending, self._pending = self._pending, None
+            self._write(*pending)
+    
+    def _write(self, sequence, content):
+        with self._write_lock:
+            if self._written is None:
+                self._written = (0, _read_text(self.path))
+            # An older snapshot may reach here after a newer one was written
+            if sequence < self._written[0]:
+                return
+            if _write_config(self.path, content, self._written[1]):
+                self._written = (sequence, content)
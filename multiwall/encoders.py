@@ -0,0 +1,133 @@
+"""
+Output encoders for the composed wallpaper.
+Each profile names a file format and its encoder settings, trading encode
+time against file size and quality.
+"""
+import os
+import time
+
+from .logger import get_logger
+from .profiling import span
+
+logger = get_logger(__name__)
+
+# name -> (file extension, Pillow format, encoder options)
+PROFILES = {
+    # Same output as earlier versions: baseline JPEG, 4:2:0 chroma
+    'jpeg-fast': ('.jpg', 'JPEG', {'quality': 95, 'subsampling': '4:2:0', 'optimize': False}),
+    # Full chroma resolution and optimized Huffman tables
+    'jpeg-hq': ('.jpg', 'JPEG', {'quality': 95, 'subsampling': '4:4:4', 'optimize': True}),
+    # Lossless; compress_level 0-9 trades encode time for size
+    'png': ('.png', 'PNG', {'compress_level': 1}),
+    'webp-lossless': ('.webp', 'WEBP', {'lossless': True, 'quality': 50, 'method': 2}),
+    'webp': ('.webp', 'WEBP', {'quality': 90, 'method': 4}),
+}
+
+DEFAULT_PROFILE = 'jpeg-fast'
+
+
+def get_profile(name=None):
+    """
+    Get an output profile, falling back to the default for unknown names.
+
+    Args:
+        name: Profile name or None for the default
+
+    Returns:
+        str: Valid profile name
+    """
+    if name is None:
+        return DEFAULT_PROFILE
+    if name not in PROFILES:
+        logger.warning(f"Unknown output profile '{name}', using {DEFAULT_PROFILE}")
+        return DEFAULT_PROFILE
+    return name
+
+
+def profile_extension(name=None):
+    """Get the file extension written by a profile (e.g. '.jpg')."""
+    return PROFILES[get_profile(name)][0]
+
+
+# Other spellings of the profile extensions
+_EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+
+
+def _normalize_extension(suffix):
+    suffix = suffix.lower()
+    return _EXTENSION_ALIASES.get(suffix, suffix)
+
+
+def extension_matches(path, name=None):
+    """
+    Check whether a file name's extension fits the format of a profile.
+
+    Args:
+        path: Output file path
+        name: Profile name
+
+    Returns:
+        bool: True if the extension names the profile's format
+    """
+    return _normalize_extension(os.path.splitext(os.fspath(path))[1]) == profile_extension(name)
+
+
+def profile_for_path(path):
+    """
+    Get the first profile writing the format named by a file's extension.
+
+    Args:
+        path: Output file path
+
+    Returns:
+        str: Profile name, or None if no profile writes that format
+    """
+    extension = _normalize_extension(os.path.splitext(os.fspath(path))[1])
+    for name, (profile_ext, _, _) in PROFILES.items():
+        if profile_ext == extension:
+            return name
+    return None
+
+
+def encoder_options(name=None, overrides=None):
+    """
+    Get the Pillow save options of a profile.
+
+    Args:
+        name: Profile name
+        overrides: Optional dict of options replacing the profile's own,
+            e.g. {'compress_level': 6} for png
+
+    Returns:
+        dict: Options passed to Image.save
+    """
+    options = dict(PROFILES[get_profile(name)][2])
+    if overrides:
+        options.update(overrides)
+    return options
+
+
+def encode(image, fp, name=None, overrides=None):
+    """
+    Encode an image with an output profile.
+
+    Args:
+        image: PIL image to encode
+        fp: Path or binary file object to write to
+        name: Profile name (default: jpeg-fast)
+        overrides: Optional encoder option overrides
+
+    Returns:
+        dict: profile, seconds and bytes written
+    """
+    name = get_profile(name)
+    pil_format = PROFILES[name][1]
+    options = encoder_options(name, overrides)
+    start = time.perf_counter()
+    with span('encode', profile=name):
+        image.save(fp, format=pil_format, **options)
+    seconds = time.perf_counter() - start
+    size = fp.tell() if hasattr(fp, 'tell') else os.path.getsize(fp)
+    logger.info(f"Encoded {image.size[0]}x{image.size[1]} as {name}: "
+                f"{size} bytes in {seconds * 1000:.0f} ms")
+    return {'profile': name, 'seconds': seconds, 'bytes': size}
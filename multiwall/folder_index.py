@@ -0,0 +1,121 @@
+"""
+Cached directory listings for the image sidebar and folder dialog.
+Directories are scanned with os.scandir, using dirent types instead of a
+stat per entry, and listings are reused until the directory's mtime changes.
+"""
+import os
+import threading
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.webp', '.gif', '.avif'}
+
+
+class _Listing:
+    """Contents of a directory at a given mtime."""
+
+    def __init__(self, mtime_ns, images, subdirs):
+        self.mtime_ns = mtime_ns
+        self.images = images
+        self.subdirs = subdirs
+
+
+_listings = {}
+_lock = threading.Lock()
+
+
+def _scan(directory):
+    """Scan a directory once, classifying entries by their dirent type."""
+    images = []
+    subdirs = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            name = entry.name
+            try:
+                if entry.is_dir():
+                    if not name.startswith('.'):
+                        subdirs.append(name)
+                elif os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                    images.append(name)
+            except OSError:
+                # Broken symlink or entry removed while scanning
+                continue
+    images.sort()
+    subdirs.sort()
+    return images, subdirs
+
+
+def _get_listing(directory):
+    """
+    Get the cached listing of a directory, rescanning it if it changed.
+
+    Raises:
+        OSError: If the directory cannot be read
+    """
+    directory = os.fspath(directory)
+    mtime_ns = os.stat(directory).st_mtime_ns
+    with _lock:
+        listing = _listings.get(directory)
+    if listing is not None and listing.mtime_ns == mtime_ns:
+        return listing
+
+    images, subdirs = _scan(directory)
+    listing = _Listing(mtime_ns, images, subdirs)
+    with _lock:
+        _listings[directory] = listing
+    logger.debug("Scanned %s: %s images, %s folders", directory, len(images), len(subdirs))
+    return listing
+
+
+def list_images(directory):
+    """
+    List image files in a directory, sorted by name.
+
+    Args:
+        directory: Directory path
+
+    Returns:
+        list: Full paths of image files
+
+    Raises:
+        OSError: If the directory cannot be read
+    """
+    listing = _get_listing(directory)
+    return [os.path.join(directory, name) for name in listing.images]
+
+
+def list_subdirs(directory):
+    """
+    List visible (non-hidden) subdirectories, sorted by name.
+
+    Args:
+        directory: Directory path
+
+    Returns:
+        list: Full paths of subdirectories, or an empty list if unreadable
+    """
+    try:
+        listing = _get_listing(directory)
+    except PermissionError:
+        logger.debug("Permission denied accessing: %s", directory)
+        return []
+    except OSError as e:
+        logger.debug("Error listing folder %s: %s", directory, e)
+        return []
+    return [os.path.join(directory, name) for name in listing.subdirs]
+
+
+def invalidate(directory=None):
+    """
+    Forget cached listings.
+
+    Args:
+        directory: Directory to forget, or None to forget all
+    """
+    with _lock:
+        if directory is None:
+            _listings.clear()
+        else:
+            _listings.pop(os.fspath(directory), None)
@@ -0,0 +1,223 @@
+"""
+Process-wide cache of decoded images.
+Keeps decoded sources in memory, keyed by file identity, with LRU eviction
+bounded by a byte budget.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MiB
+
+
+def file_identity(path):
+    """
+    Get the identity of a file on disk.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        tuple: (path, mtime_ns, size) or None if the file cannot be stat'ed
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def image_nbytes(img):
+    """Approximate memory used by a decoded PIL image."""
+    bands = len(img.getbands())
+    return img.width * img.height * max(bands, 1)
+
+
+class ImageCache:
+    """
+    Thread-safe LRU cache of decoded PIL images.
+
+    Entries are keyed by file identity (path, mtime, size) plus an optional
+    variant tag, so a file modified on disk is never served stale. Cached
+    images are shared and must be treated as read-only by callers.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._loading = {}  # key -> Event set when an in-flight decode ends
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes):
+        """
+        Change the byte budget, evicting entries if needed.
+
+        Args:
+            max_bytes: New budget in bytes (0 disables caching)
+        """
+        with self._lock:
+            self.max_bytes = max(0, int(max_bytes))
+            self._evict_locked()
+        logger.debug(f"Image cache budget set to {self.max_bytes} bytes")
+
+    def get(self, path, loader, variant=None):
+        """
+        Get a decoded image, decoding it with loader on a miss.
+
+        Args:
+            path: Path to the image file
+            loader: Callable taking the path and returning a PIL image or None
+            variant: Optional hashable tag for alternative decodes of the same file
+
+        Returns:
+            PIL.Image: Decoded image or None if loading failed
+        """
+        identity = file_identity(path)
+        if identity is None:
+            return loader(path)
+
+        key = (identity, variant)
+        while True:
+            with self._lock:
+                img = self._entries.get(key)
+                if img is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return img
+                loading = self._loading.get(key)
+                if loading is None:
+                    # This thread decodes; others asking for key wait for it
+                    loading = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            loading.wait()
+            with self._lock:
+                if key not in self._entries:
+                    # Decode failed or was not cacheable: load independently
+                    self.misses += 1
+                    return loader(path)
+
+        try:
+            img = loader(path)
+            if img is not None:
+                self.put(key, img)
+            return img
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def peek(self, path, variant=None):
+        """
+        Get a decoded image only if it is already cached.
+
+        Args:
+            path: Path to the image file
+            variant: Optional variant tag
+
+        Returns:
+            PIL.Image: Cached image or None
+        """
+        identity = file_identity(path)
+        if identity is None:
+            return None
+        key = (identity, variant)
+        with self._lock:
+            img = self._entries.get(key)
+            if img is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return img
+
+    def peek_any(self, path, min_size=None):
+        """
+        Get a cached decode of a file whatever its variant, without loading.
+        
+        Args:
+            path: Path to the image file
+            min_size: Optional (width, height); the smallest decode at least
+                this large is preferred, else the largest one
+                
+        Returns:
+            PIL.Image: Cached image or None
+        """
+        identity = file_identity(path)
+        if identity is None:
+            return None
+        with self._lock:
+            images = [img for (ident, _), img in self._entries.items() if ident == identity]
+        if not images:
+            return None
+        if min_size:
+            large = [img for img in images
+                     if img.width >= min_size[0] and img.height >= min_size[1]]
+            if large:
+                return min(large, key=lambda img: img.width * img.height)
+        return max(images, key=lambda img: img.width * img.height)
+
+    def put(self, key, img):
+        """Insert an image under key, evicting least recently used entries."""
+        size = image_nbytes(img)
+        with self._lock:
+            if size > self.max_bytes:
+                logger.debug("Image too large to cache (%s bytes)", size)
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= image_nbytes(old)
+            self._entries[key] = img
+            self.current_bytes += size
+            self._evict_locked()
+
+    def invalidate(self, path):
+        """Drop every cached entry for path."""
+        path = str(path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0][0] == path]:
+                self.current_bytes -= image_nbytes(self._entries.pop(key))
+
+    def clear(self):
+        """Drop all cached entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: hits, misses, evictions, entries, bytes and max_bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _evict_locked(self):
+        while self._entries and self.current_bytes > self.max_bytes:
+            _, img = self._entries.popitem(last=False)
+            self.current_bytes -= image_nbytes(img)
+            self.evictions += 1
+
+
+# Shared instance used by the composer and the sidebar
+image_cache = ImageCache()
+
+
+def get_image_cache():
+    """Get the process-wide decoded image cache."""
+    return image_cache
@@ -1,29 +1,132 @@
 import os
 import i18n
 from pathlib import Path
-from PIL import Image
-import io
+import bisect
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from gi import require_version
 require_version('Gtk', '4.0')
-from gi.repository import Gtk, GdkPixbuf, GLib, Gio
+from gi.repository import Gtk, Gdk, GdkPixbuf, GLib, Gio, GObject
+from . import folder_index
+from .folder_index import IMAGE_EXTENSIONS
+from .image_cache import get_image_cache
 from .logger import get_logger
+from .profiling import span
 
 logger = get_logger(__name__)
 
-IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.webp', '.gif', '.avif'}
 THUMBNAIL_SIZE = 100
+THUMBNAIL_WORKERS = min(os.cpu_count() or 1, 4)
+BATCH_SIZE = 32  # Thumbnails applied per idle callback
+FOLDER_EVENTS_DELAY_MS = 300  # Quiet time before folder change events are applied
+FOLDER_EVENTS_MAX_DELAY_MS = 2000  # Apply at least this often during bursts
+MAX_TEXTURES = 256  # Thumbnail textures kept in memory
+
+
+def load_thumbnail_texture(image_path):
+    """
+    Load a thumbnail texture for an image. Safe to call from worker threads.
+    
+    Args:
+        image_path: Path to image file
+        
+    Returns:
+        Gdk.Texture: Thumbnail or None if the image cannot be loaded
+    """
+    logger.debug("Creating thumbnail for: %s", os.path.basename(image_path))
+    # Imported here so Pillow is not loaded before the window is shown
+    from .thumbnail_cache import get_thumbnail
+    
+    # Prefer the persistent (freedesktop) thumbnail, generated only if
+    # missing or stale; fall back to decoding the original file
+    source_path = get_thumbnail(image_path) or image_path
+    
+    # Load and scale image
+    # Try GdkPixbuf first, fallback to Pillow for unsupported formats
+    try:
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+            source_path,
+            THUMBNAIL_SIZE,
+            THUMBNAIL_SIZE,
+            True  # preserve_aspect_ratio
+        )
+        logger.debug("Thumbnail loaded with GdkPixbuf: %s", os.path.basename(image_path))
+        return Gdk.Texture.new_for_pixbuf(pixbuf)
+    except Exception as e:
+        logger.debug("GdkPixbuf failed for %s, trying Pillow...", os.path.basename(image_path))
+    
+    # Fallback to Pillow for formats not supported by GdkPixbuf (e.g., AVIF)
+    try:
+        from PIL import Image
+        from .utils import pil_to_texture
+        # Reuse a decode from the composer if available, else load with Pillow
+        # The texture is built straight from the pixel buffer
+        cached = get_image_cache().peek(image_path)
+        if cached is not None:
+            # resize() returns a new image, so the shared decode is neither
+            # copied nor modified; images smaller than the thumbnail are
+            # never upscaled
+            ratio = min(1.0, THUMBNAIL_SIZE / cached.width, THUMBNAIL_SIZE / cached.height)
+            if ratio < 1.0:
+                size = (max(1, round(cached.width * ratio)), max(1, round(cached.height * ratio)))
+                cached = cached.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+            texture = pil_to_texture(cached)
+        else:
+            with Image.open(image_path) as pil_img:
+                pil_img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+                texture = pil_to_texture(pil_img)
+        logger.debug("Thumbnail loaded with Pillow: %s", os.path.basename(image_path))
+        return texture
+    except Exception as e2:
+        logger.error(f"Failed to load thumbnail for {os.path.basename(image_path)}: {e2}")
+        return None
+
+
+class ImageItem(GObject.Object):
+    """List model item for an image file in the sidebar."""
+    __gtype_name__ = 'MultiWallImageItem'
+    
+    path = GObject.Property(type=str)
 
 
 class ImageSidebar(Gtk.Box):
     """Sidebar displaying image thumbnails in a grid."""
     
-    def __init__(self, pictures_dir, on_image_selected_cb):
+    def __init__(self, pictures_dir, on_image_selected_cb, load=True):
+        """
+        Args:
+            pictures_dir: Folder whose images are shown
+            on_image_selected_cb: Called with (image_path, button) on click
+            load: Load the folder now; pass False to call load_images()
+                later, e.g. once the window has been shown
+        """
         super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=0)
         
         self.pictures_dir = pictures_dir
         self.on_image_selected_cb = on_image_selected_cb
         self.current_images = []
         
+        # Background thumbnail loading state
+        self._executor = ThreadPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS,
+            thread_name_prefix='multiwall-thumb'
+        )
+        self._load_generation = 0
+        self._inflight = {}  # path -> future loading its thumbnail
+        self._bound = {}  # path -> list items currently showing it
+        self._textures = OrderedDict()  # LRU of loaded thumbnail textures
+        self._failed = set()
+        self._folder_monitor = None
+        self._watched_dir = None
+        self._folder_events = {}  # path -> 'update', 'refresh' or 'remove'
+        self._folder_flush_id = 0
+        self._folder_events_since = 0.0  # When the pending batch started
+        self._results = deque()
+        self._results_lock = threading.Lock()
+        self._flush_scheduled = False
+        
         logger.info(f"Initializing ImageSidebar with directory: {pictures_dir}")
         
         # Sidebar styling - compact
@@ -56,7 +159,7 @@ class ImageSidebar(Gtk.Box):
         refresh_btn = Gtk.Button()
         refresh_btn.set_icon_name('view-refresh-symbolic')
         refresh_btn.set_tooltip_text(i18n.t('sidebar.refresh'))
-        refresh_btn.connect('clicked', lambda _: self.load_images())
+        refresh_btn.connect('clicked', self.on_refresh)
         refresh_btn.add_css_class('flat')
         header.append(refresh_btn)
         
@@ -82,22 +185,40 @@ class ImageSidebar(Gtk.Box):
         scroll.set_hexpand(True)
         self.append(scroll)
         
-        # FlowBox for thumbnail grid - compact
-        self.flowbox = Gtk.FlowBox()
-        self.flowbox.set_valign(Gtk.Align.START)
-        self.flowbox.set_max_children_per_line(2)
-        self.flowbox.set_min_children_per_line(2)
-        self.flowbox.set_selection_mode(Gtk.SelectionMode.NONE)
-        self.flowbox.set_homogeneous(True)
-        self.flowbox.set_column_spacing(6)
-        self.flowbox.set_row_spacing(6)
-        self.flowbox.set_margin_start(8)
-        self.flowbox.set_margin_end(8)
-        self.flowbox.set_margin_top(4)
-        self.flowbox.set_margin_bottom(8)
-        scroll.set_child(self.flowbox)
+        # Virtualized thumbnail grid: only visible tiles are materialized
+        self.store = Gio.ListStore(item_type=ImageItem)
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self.on_tile_setup)
+        factory.connect('bind', self.on_tile_bind)
+        factory.connect('unbind', self.on_tile_unbind)
+        
+        self.grid = Gtk.GridView(model=Gtk.NoSelection(model=self.store), factory=factory)
+        self.grid.set_max_columns(2)
+        self.grid.set_min_columns(2)
+        self.grid.set_margin_start(8)
+        self.grid.set_margin_end(8)
+        self.grid.set_margin_top(4)
+        self.grid.set_margin_bottom(8)
+        scroll.set_child(self.grid)
+        
+        # Stop background work when the sidebar goes away
+        self.connect('destroy', self.on_destroy)
         
         # Load initial images
+        if load:
+            self.load_images()
+        else:
+            self.update_folder_label()
+    
+    def on_destroy(self, widget):
+        """Cancel thumbnail loading and stop the worker pool."""
+        self.watch_folder(None)
+        self.cancel_loading()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def on_refresh(self, button):
+        """Rescan the current folder, ignoring the cached listing."""
+        folder_index.invalidate(self.pictures_dir)
         self.load_images()
     
     def update_folder_label(self):
@@ -111,110 +232,168 @@ class ImageSidebar(Gtk.Box):
         """Load images from current directory."""
         logger.info(f"Loading images from: {self.pictures_dir}")
         
-        # Clear flowbox
-        while True:
-            child = self.flowbox.get_first_child()
-            if child is None:
-                break
-            self.flowbox.remove(child)
+        # Drop work still queued for the previous folder
+        self.cancel_loading()
         
         self.current_images = []
         
         # Update folder label
         self.update_folder_label()
         
+        # Follow changes to the folder instead of rescanning it
+        self.watch_folder(self.pictures_dir)
+        
         # Verify directory exists
         if not os.path.exists(self.pictures_dir):
             logger.warning(f"Directory does not exist: {self.pictures_dir}")
+            self.store.remove_all()
             return
         
-        # Search for image files
+        # Search for image files (cached until the folder changes)
         try:
-            for entry in sorted(Path(self.pictures_dir).iterdir()):
-                if entry.is_file() and entry.suffix.lower() in IMAGE_EXTENSIONS:
-                    self.current_images.append(str(entry))
+            with span('list_images'):
+                self.current_images = folder_index.list_images(self.pictures_dir)
         except PermissionError as e:
             logger.error(f"Permission denied listing images: {e}")
+            self.store.remove_all()
             return
         except Exception as e:
             logger.error(f"Error listing images: {e}")
+            self.store.remove_all()
             return
         
         logger.info(f"Found {len(self.current_images)} images in {self.pictures_dir}")
         
-        # Create thumbnails
-        for image_path in self.current_images:
-            self.create_thumbnail(image_path)
+        # Thumbnails are requested when tiles are bound
+        with span('populate_store', images=len(self.current_images)):
+            items = [ImageItem(path=image_path) for image_path in self.current_images]
+            self.store.splice(0, self.store.get_n_items(), items)
     
-    def create_thumbnail(self, image_path):
+    def watch_folder(self, directory):
         """
-        Create a thumbnail for an image.
+        Monitor a folder for changes, replacing any previous monitor.
         
         Args:
-            image_path: Path to image file
+            directory: Folder to watch, or None to stop watching
         """
-        logger.debug(f"Creating thumbnail for: {os.path.basename(image_path)}")
-        
+        if directory == self._watched_dir and self._folder_monitor is not None:
+            return
+        if self._folder_monitor is not None:
+            self._folder_monitor.cancel()
+            self._folder_monitor = None
+        if self._folder_flush_id:
+            GLib.source_remove(self._folder_flush_id)
+            self._folder_flush_id = 0
+        self._folder_events = {}
+        self._watched_dir = directory
+        if directory is None or not os.path.isdir(directory):
+            return
+        try:
+            gfile = Gio.File.new_for_path(directory)
+            self._folder_monitor = gfile.monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+            self._folder_monitor.connect('changed', self.on_folder_changed)
+            logger.debug(f"Watching folder: {directory}")
+        except GLib.Error as e:
+            logger.warning(f"Cannot watch folder {directory}: {e.message}")
+    
+    def on_folder_changed(self, monitor, gfile, other_file, event_type):
+        """
+        Record a folder change. Changes are applied once the folder has been
+        quiet for FOLDER_EVENTS_DELAY_MS (or at most every
+        FOLDER_EVENTS_MAX_DELAY_MS while events keep arriving).
+        """
+        E = Gio.FileMonitorEvent
+        if event_type == E.CHANGES_DONE_HINT:
+            # The file is complete: drop thumbnails made from partial data
+            self._folder_events[gfile.get_path()] = 'refresh'
+        elif event_type in (E.CREATED, E.CHANGED, E.MOVED_IN):
+            if self._folder_events.get(gfile.get_path()) != 'refresh':
+                self._folder_events[gfile.get_path()] = 'update'
+        elif event_type in (E.DELETED, E.MOVED_OUT):
+            self._folder_events[gfile.get_path()] = 'remove'
+        elif event_type == E.RENAMED:
+            self._folder_events[gfile.get_path()] = 'remove'
+            if other_file is not None:
+                self._folder_events[other_file.get_path()] = 'update'
+        else:
+            return
+        now = time.monotonic()
+        if self._folder_flush_id:
+            if (now - self._folder_events_since) * 1000 >= FOLDER_EVENTS_MAX_DELAY_MS:
+                return  # Keep the pending timer so bursts are still applied
+            GLib.source_remove(self._folder_flush_id)
+        else:
+            self._folder_events_since = now
+        self._folder_flush_id = GLib.timeout_add(FOLDER_EVENTS_DELAY_MS, self._apply_folder_events)
+    
+    def _apply_folder_events(self):
+        """Add, refresh or remove single tiles for recorded folder changes."""
+        self._folder_flush_id = 0
+        events, self._folder_events = self._folder_events, {}
+        folder_index.invalidate(self.pictures_dir)
+        
+        for image_path, action in events.items():
+            if os.path.dirname(image_path) != os.path.normpath(self.pictures_dir):
+                continue
+            if os.path.splitext(image_path)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            self._forget_thumbnail(image_path)
+            if action == 'refresh':
+                from .thumbnail_cache import invalidate_thumbnail
+                invalidate_thumbnail(image_path)
+            
+            pos = bisect.bisect_left(self.current_images, image_path)
+            present = pos < len(self.current_images) and self.current_images[pos] == image_path
+            exists = action != 'remove' and os.path.isfile(image_path)
+            
+            if present and exists:
+                # Re-insert so bound tiles reload the thumbnail
+                self.store.splice(pos, 1, [ImageItem(path=image_path)])
+            elif present:
+                del self.current_images[pos]
+                self.store.remove(pos)
+            elif exists:
+                self.current_images.insert(pos, image_path)
+                self.store.insert(pos, ImageItem(path=image_path))
+        
+        logger.debug(f"Applied {len(events)} folder changes, {len(self.current_images)} images")
+        return False
+    
+    def _forget_thumbnail(self, image_path):
+        """Drop everything cached in memory for an image."""
+        self._textures.pop(image_path, None)
+        self._failed.discard(image_path)
+        future = self._inflight.pop(image_path, None)
+        if future is not None:
+            future.cancel()
+        get_image_cache().invalidate(image_path)
+    
+    def cancel_loading(self):
+        """Cancel outstanding thumbnail work and drop loaded thumbnails."""
+        self._load_generation += 1
+        for future in self._inflight.values():
+            future.cancel()
+        self._inflight = {}
+        with self._results_lock:
+            self._results.clear()
+        self._textures.clear()
+        self._failed.clear()
+    
+    def on_tile_setup(self, factory, list_item):
+        """Build the widgets of a grid tile (reused across items)."""
         # Create container for thumbnail
         button = Gtk.Button()
         button.add_css_class('flat')
-        button.set_tooltip_text(os.path.basename(image_path))
         
         # Box for image and name - compact
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
         
-        # Load and scale image
-        # Try GdkPixbuf first, fallback to Pillow for unsupported formats
-        pixbuf = None
-        try:
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                image_path,
-                THUMBNAIL_SIZE,
-                THUMBNAIL_SIZE,
-                True  # preserve_aspect_ratio
-            )
-            logger.debug(f"Thumbnail loaded with GdkPixbuf: {os.path.basename(image_path)}")
-        except Exception as e:
-            logger.debug(f"GdkPixbuf failed for {os.path.basename(image_path)}, trying Pillow...")
-            # Fallback to Pillow for formats not supported by GdkPixbuf (e.g., AVIF)
-            try:
-                # Load with Pillow
-                pil_img = Image.open(image_path)
-                pil_img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
-                
-                # Convert to RGB if necessary
-                if pil_img.mode != 'RGB':
-                    pil_img = pil_img.convert('RGB')
-                
-                # Convert PIL to PNG bytes
-                img_bytes = io.BytesIO()
-                pil_img.save(img_bytes, format='PNG')
-                img_data = img_bytes.getvalue()
-                
-                # Create GdkPixbuf from bytes using GLib.Bytes
-                bytes_obj = GLib.Bytes.new(img_data)
-                stream = Gio.MemoryInputStream.new_from_bytes(bytes_obj)
-                pixbuf = GdkPixbuf.Pixbuf.new_from_stream(stream, None)
-                
-                logger.info(f"Thumbnail loaded with Pillow: {os.path.basename(image_path)}")
-            except Exception as e2:
-                logger.error(f"Failed to load thumbnail for {os.path.basename(image_path)}: {e2}")
-                return
-        
-        if pixbuf is None:
-            logger.warning(f"Could not load thumbnail: {os.path.basename(image_path)}")
-            return
-        
-        image = Gtk.Image.new_from_pixbuf(pixbuf)
+        image = Gtk.Image()
         image.set_size_request(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
         box.append(image)
         
         # Filename (truncated) - smaller text
         label = Gtk.Label()
-        filename = os.path.basename(image_path)
-        if len(filename) > 15:
-            filename = filename[:12] + "..."
-        label.set_text(filename)
         label.add_css_class('caption')
         label.set_ellipsize(3)  # ELLIPSIZE_END
         box.append(label)
@@ -222,10 +401,117 @@ class ImageSidebar(Gtk.Box):
         button.set_child(box)
         
         # Connect click - pass button as additional parameter
-        button.connect('clicked', self.on_thumbnail_clicked, image_path)
+        button.connect('clicked', self.on_tile_clicked, list_item)
+        list_item.set_child(button)
+    
+    def _tile_widgets(self, list_item):
+        button = list_item.get_child()
+        image = button.get_child().get_first_child()
+        return button, image, image.get_next_sibling()
+    
+    def on_tile_bind(self, factory, list_item):
+        """Show an item in a tile, loading its thumbnail if needed."""
+        image_path = list_item.get_item().path
+        button, image, label = self._tile_widgets(list_item)
+        
+        button.set_tooltip_text(os.path.basename(image_path))
+        filename = os.path.basename(image_path)
+        if len(filename) > 15:
+            filename = filename[:12] + "..."
+        label.set_text(filename)
         
-        # Add to flowbox
-        self.flowbox.append(button)
+        self._bound.setdefault(image_path, set()).add(list_item)
+        self._show_thumbnail(image, image_path)
+        
+        if (image_path not in self._textures and image_path not in self._failed
+                and image_path not in self._inflight):
+            self._inflight[image_path] = self._executor.submit(
+                self._thumbnail_job, self._load_generation, image_path
+            )
+    
+    def on_tile_unbind(self, factory, list_item):
+        """Release a tile; cancel its thumbnail load if nothing shows it."""
+        item = list_item.get_item()
+        if item is None:
+            return
+        image_path = item.path
+        bound = self._bound.get(image_path)
+        if bound is not None:
+            bound.discard(list_item)
+            if not bound:
+                del self._bound[image_path]
+                future = self._inflight.get(image_path)
+                if future is not None and future.cancel():
+                    del self._inflight[image_path]
+        _, image, _ = self._tile_widgets(list_item)
+        image.clear()
+    
+    def _show_thumbnail(self, image, image_path):
+        """Show the loaded thumbnail, or a placeholder icon while loading."""
+        texture = self._textures.get(image_path)
+        if texture is not None:
+            self._textures.move_to_end(image_path)
+            image.set_pixel_size(THUMBNAIL_SIZE)
+            image.set_from_paintable(texture)
+            return
+        image.set_pixel_size(THUMBNAIL_SIZE // 2)
+        if image_path in self._failed:
+            image.set_from_icon_name('image-missing-symbolic')
+        else:
+            image.set_from_icon_name('image-x-generic-symbolic')
+    
+    def _thumbnail_job(self, generation, image_path):
+        """Load a thumbnail on a worker thread and queue it for the UI."""
+        if generation != self._load_generation:
+            return
+        with span('thumbnail'):
+            texture = load_thumbnail_texture(image_path)
+        if generation != self._load_generation:
+            return
+        with self._results_lock:
+            self._results.append((generation, image_path, texture))
+        GLib.idle_add(self._schedule_flush)
+    
+    def _schedule_flush(self):
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            GLib.idle_add(self._flush_results)
+        return False
+    
+    def _flush_results(self):
+        """Apply a batch of finished thumbnails to bound tiles (idle callback)."""
+        with self._results_lock:
+            batch = [self._results.popleft() for _ in range(min(BATCH_SIZE, len(self._results)))]
+            more = bool(self._results)
+        
+        with span('apply_thumbnails', count=len(batch)):
+            self._apply_thumbnails(batch)
+        
+        self._flush_scheduled = more
+        return more
+    
+    def _apply_thumbnails(self, batch):
+        """Show finished thumbnails in their bound tiles."""
+        for generation, image_path, texture in batch:
+            # Skip results of other folders or of files invalidated since
+            if generation != self._load_generation or image_path not in self._inflight:
+                continue
+            del self._inflight[image_path]
+            if texture is None:
+                self._failed.add(image_path)
+            else:
+                self._textures[image_path] = texture
+                while len(self._textures) > MAX_TEXTURES:
+                    self._textures.popitem(last=False)
+            for list_item in self._bound.get(image_path, ()):
+                _, image, _ = self._tile_widgets(list_item)
+                self._show_thumbnail(image, image_path)
+    
+    def on_tile_clicked(self, button, list_item):
+        """Callback when a grid tile is clicked."""
+        item = list_item.get_item()
+        if item is not None:
+            self.on_thumbnail_clicked(button, item.path)
     
     def on_thumbnail_clicked(self, button, image_path):
         """Callback when thumbnail is clicked."""
@@ -286,53 +572,73 @@ class ImageSidebar(Gtk.Box):
         selection = tree.get_selection()
         selection.connect("changed", on_tree_selection_changed)
         
-        # Populate tree with common folders and subdirectories
-        def add_folder_to_tree(parent_iter, folder_path, max_depth=2, current_depth=0):
-            try:
-                if current_depth >= max_depth:
-                    return
-                    
-                for entry in sorted(Path(folder_path).iterdir()):
-                    if entry.is_dir() and not entry.name.startswith('.'):
-                        folder_iter = store.append(parent_iter, [f"📁 {entry.name}", str(entry)])
-                        # Add subdirectories recursively
-                        if current_depth < max_depth - 1:
-                            add_folder_to_tree(folder_iter, entry, max_depth, current_depth + 1)
-            except PermissionError:
-                logger.debug(f"Permission denied accessing: {folder_path}")
-            except Exception as e:
-                logger.debug(f"Error listing folder {folder_path}: {e}")
+        # Folders are listed lazily: nodes with subfolders get a placeholder
+        # child that is replaced by the real subfolders when first expanded.
+        # Listings are cached by folder_index, so expanding reuses them
+        def append_folder(parent_iter, label, folder_path):
+            folder_iter = store.append(parent_iter, [label, folder_path])
+            if folder_index.list_subdirs(folder_path):
+                store.append(folder_iter, ["", ""])
+            return folder_iter
+        
+        def populate(folder_iter):
+            child = store.iter_children(folder_iter)
+            if child is None or store[child][1] != "":
+                return
+            store.remove(child)
+            for subdir in folder_index.list_subdirs(store[folder_iter][1]):
+                append_folder(folder_iter, f"📁 {os.path.basename(subdir)}", subdir)
+        
+        tree.connect('test-expand-row', lambda view, treeiter, path: populate(treeiter) or False)
         
         # Add main folders
         home = Path.home()
         
         # Home
-        home_iter = store.append(None, [f"🏠 {home.name}", str(home)])
-        add_folder_to_tree(home_iter, home, max_depth=3)
+        append_folder(None, f"🏠 {home.name}", str(home))
         
         # Common folders
         common_folders = ['Documents', 'Downloads', 'Pictures', 'Music', 'Videos', 
                          'Documentos', 'Descargas', 'Imágenes', 'Música', 'Vídeos']
         
+        home_subdirs = set(folder_index.list_subdirs(str(home)))
         for folder_name in common_folders:
-            folder_path = home / folder_name
-            if folder_path.exists() and folder_path.is_dir():
-                folder_iter = store.append(None, [f"📁 {folder_name}", str(folder_path)])
-                add_folder_to_tree(folder_iter, folder_path, max_depth=2)
+            folder_path = str(home / folder_name)
+            if folder_path in home_subdirs:
+                append_folder(None, f"📁 {folder_name}", folder_path)
         
         # Expand home by default
         tree.expand_row(Gtk.TreePath.new_first(), False)
         
-        # Select current folder if in tree
+        # Select current folder, expanding only the folders on its path
         def select_current_folder():
-            def search_and_select(model, path, iter, search_path):
-                if model[iter][1] == search_path:
-                    tree.get_selection().select_iter(iter)
-                    tree.scroll_to_cell(path, None, True, 0.5, 0.5)
-                    return True
-                return False
+            target = os.path.normpath(self.pictures_dir)
+            best = None
+            treeiter = store.get_iter_first()
+            while treeiter is not None:
+                root = store[treeiter][1]
+                if (target == root or target.startswith(root.rstrip(os.sep) + os.sep)) and \
+                        (best is None or len(root) > len(store[best][1])):
+                    best = treeiter
+                treeiter = store.iter_next(treeiter)
+            
+            current = best
+            while current is not None and store[current][1] != target:
+                tree.expand_row(store.get_path(current), False)
+                child = store.iter_children(current)
+                current = None
+                while child is not None:
+                    child_path = store[child][1]
+                    if child_path and (target == child_path or target.startswith(child_path + os.sep)):
+                        current = child
+                        break
+                    child = store.iter_next(child)
             
-            store.foreach(search_and_select, self.pictures_dir)
+            if current is not None:
+                path = store.get_path(current)
+                tree.get_selection().select_iter(current)
+                tree.scroll_to_cell(path, None, True, 0.5, 0.5)
+            return False
         
         GLib.idle_add(select_current_folder)
         
@@ -1,14 +1,32 @@
 """
 Logging system for MultiWall.
-Provides file and console logging with configurable levels.
+Provides file and console logging with configurable levels. Records are
+written by a background thread, so logging never blocks the GTK main loop
+on disk I/O, and the log file is rotated by size.
 """
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from datetime import datetime
+
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate the log file at 5 MiB
+LOG_BACKUP_COUNT = 3  # Rotated files kept
 
 # Keep track of configured loggers
 _configured_loggers = set()
+# Writer threads, stopped (and flushed) at exit
+_listeners = []
+
+
+def _stop_listeners():
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(_stop_listeners)
+
 
 def setup_logger(name, level=logging.INFO):
     """
@@ -45,30 +63,44 @@ def setup_logger(name, level=logging.INFO):
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
+        handlers = [console_handler]
         
         # File handler (optional, only if writable)
+        log_file = None
+        file_error = None
         try:
             log_dir = Path.home() / ".config" / "multiwall" / "logs"
             log_dir.mkdir(parents=True, exist_ok=True)
             
-            # Log file with date
-            log_file = log_dir / f"multiwall_{datetime.now().strftime('%Y%m%d')}.log"
-            
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setLevel(logging.DEBUG)  # File always in DEBUG
+            log_file = log_dir / "multiwall.log"
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            )
+            file_handler.setLevel(logging.DEBUG)  # Same level as the logger
             
             file_formatter = logging.Formatter(
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
                 datefmt='%Y-%m-%d %H:%M:%S'
             )
             file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
-            
-            logger.info(f"Logging to file: {log_file}")
-            
+            handlers.append(file_handler)
         except Exception as e:
-            logger.warning(f"Could not create log file: {e}")
+            file_error = e
+        
+        # Callers only enqueue records; a listener thread writes them
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        logger.addHandler(QueueHandler(log_queue))
+        
+        if file_error is None:
+            logger.info("Logging to file: %s", log_file)
+        else:
+            logger.warning("Could not create log file: %s", file_error)
     
     return logger
 
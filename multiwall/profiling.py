@@ -0,0 +1,236 @@
+"""
+Stage timing for MultiWall.
+Code marks its stages with span(). When profiling is enabled (--profile)
+each span is recorded and can be written as a Chrome trace-event file,
+viewable in chrome://tracing or Perfetto, and summarized per stage. When
+disabled, span() returns a shared no-op context manager.
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TRACE_FILE = "multiwall-trace.json"
+
+_enabled = False
+_events = []
+_events_lock = threading.Lock()
+_t0_ns = time.perf_counter_ns()
+
+
+class _NullSpan:
+    """Span used while profiling is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Records the time between __enter__ and __exit__ as one event."""
+
+    __slots__ = ('name', 'args', 'start_ns')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, self.start_ns, time.perf_counter_ns(), self.args)
+        return False
+
+
+def enable(enabled=True):
+    """
+    Turn span recording on or off.
+
+    Args:
+        enabled: Record spans from now on
+    """
+    global _enabled
+    _enabled = bool(enabled)
+    logger.debug(f"Profiling {'enabled' if _enabled else 'disabled'}")
+
+
+def is_enabled():
+    """Check whether spans are being recorded."""
+    return _enabled
+
+
+def span(name, **args):
+    """
+    Time a stage.
+
+    Usage:
+        with span('decode', path=path):
+            ...
+
+    Args:
+        name: Stage name, used to group the summary
+        **args: Optional details stored with the trace event
+
+    Returns:
+        Context manager recording the stage, or a no-op when disabled
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def record(name, start_ns, end_ns, args=None):
+    """
+    Record a stage measured by the caller.
+
+    Args:
+        name: Stage name
+        start_ns: Start time from time.perf_counter_ns()
+        end_ns: End time from time.perf_counter_ns()
+        args: Optional dict of details
+    """
+    if not _enabled:
+        return
+    event = (name, start_ns, end_ns, threading.get_ident(), args or None)
+    with _events_lock:
+        _events.append(event)
+
+
+def reset():
+    """Forget all recorded spans."""
+    with _events_lock:
+        _events.clear()
+
+
+def _snapshot():
+    with _events_lock:
+        return list(_events)
+
+
+def chrome_trace():
+    """
+    Get the recorded spans in Chrome trace-event format.
+
+    Returns:
+        dict: Trace with one complete ('X') event per span
+    """
+    pid = os.getpid()
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    trace_events = []
+    tids = set()
+    for name, start_ns, end_ns, tid, args in _snapshot():
+        event = {
+            'name': name,
+            'cat': 'multiwall',
+            'ph': 'X',
+            'ts': (start_ns - _t0_ns) / 1000,
+            'dur': (end_ns - start_ns) / 1000,
+            'pid': pid,
+            'tid': tid,
+        }
+        if args:
+            event['args'] = {key: str(value) for key, value in args.items()}
+        trace_events.append(event)
+        tids.add(tid)
+    for tid in sorted(tids):
+        if tid in thread_names:
+            trace_events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                'args': {'name': thread_names[tid]},
+            })
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summary():
+    """
+    Get per-stage statistics of the recorded spans.
+
+    Returns:
+        dict: Stage name -> {'count', 'total_ms', 'p50_ms', 'p95_ms'},
+            ordered by total time, largest first
+    """
+    durations = {}
+    for name, start_ns, end_ns, _, _ in _snapshot():
+        durations.setdefault(name, []).append((end_ns - start_ns) / 1e6)
+    stats = {}
+    for name, values in durations.items():
+        values.sort()
+        stats[name] = {
+            'count': len(values),
+            'total_ms': sum(values),
+            'p50_ms': _percentile(values, 0.50),
+            'p95_ms': _percentile(values, 0.95),
+        }
+    return dict(sorted(stats.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+
+def format_summary(stats=None):
+    """
+    Format the per-stage summary as a text table.
+
+    Args:
+        stats: Result of summary() (computed if None)
+
+    Returns:
+        str: Table with one row per stage
+    """
+    stats = summary() if stats is None else stats
+    width = max([len('stage')] + [len(name) for name in stats])
+    lines = [f"{'stage':<{width}}  {'count':>6}  {'total ms':>10}  {'p50 ms':>9}  {'p95 ms':>9}"]
+    for name, s in stats.items():
+        lines.append(f"{name:<{width}}  {s['count']:>6}  {s['total_ms']:>10.1f}  "
+                     f"{s['p50_ms']:>9.2f}  {s['p95_ms']:>9.2f}")
+    return "\n".join(lines)
+
+
+def write_trace(path):
+    """
+    Write the recorded spans as a Chrome trace-event JSON file.
+
+    Args:
+        path: Output file path
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(), f)
+    logger.info(f"Profile trace written to: {path}")
+
+
+def finish(path, stream=None):
+    """
+    Write the trace file and print the per-stage summary, if enabled.
+
+    Args:
+        path: Trace file path
+        stream: Text stream for the summary (default: sys.stderr)
+    """
+    if not _enabled:
+        return
+    stream = stream or sys.stderr
+    try:
+        write_trace(path)
+    except OSError as e:
+        logger.error(f"Could not write profile trace {path}: {e}")
+    print(format_summary(), file=stream)
+    print(f"Trace: {path}", file=stream)
@@ -0,0 +1,219 @@
+"""
+On-disk cache of encoded wallpapers.
+Renders are keyed by a hash of the monitor layout, each monitor's state and
+the identity of its source file, so applying an unchanged configuration
+reuses the encoded image instead of composing and encoding it again.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from .config import DEFAULT_OPTIONS
+from .encoders import encode, encoder_options, extension_matches, get_profile, profile_extension
+from .image_cache import file_identity
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_RENDERS = 4
+# Bump when the composer output changes so old renders are not reused
+RENDER_VERSION = 1
+
+_max_renders = DEFAULT_MAX_RENDERS
+
+
+def get_render_cache_dir():
+    """Get the directory where encoded renders are kept."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / ".cache")
+    return Path(cache_home) / "multiwall" / "renders"
+
+
+def set_max_renders(count):
+    """
+    Set how many recent renders are kept on disk.
+
+    Args:
+        count: Number of renders (0 disables the cache)
+    """
+    global _max_renders
+    _max_renders = max(0, int(count))
+    logger.debug(f"Render cache size set to {_max_renders}")
+
+
+def render_key(rects, states, profile=None, options=None):
+    """
+    Get the cache key of a composition.
+
+    Args:
+        rects: List of (x, y, width, height) monitor rectangles
+        states: Dict of monitor states (file, mode, background)
+        profile: Output profile name
+        options: Encoder option overrides
+
+    Returns:
+        str: Hex digest identifying the encoded output
+    """
+    monitors = []
+    for i, rect in enumerate(rects):
+        state = states.get(str(i), {})
+        file = state.get('file')
+        monitors.append({
+            'rect': list(rect),
+            'source': list(file_identity(file) or (file,)) if file else None,
+            'mode': state.get('mode', DEFAULT_OPTIONS['mode']),
+            'background': state.get('background', DEFAULT_OPTIONS['background']),
+        })
+    payload = json.dumps(
+        {
+            'version': RENDER_VERSION,
+            'profile': get_profile(profile),
+            'encoder': encoder_options(profile, options),
+            'monitors': monitors,
+        },
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def lookup(key, profile=None):
+    """
+    Find a cached render, marking it as recently used.
+
+    Args:
+        key: Render key from render_key()
+        profile: Output profile the render was encoded with
+
+    Returns:
+        Path: Cached file or None
+    """
+    path = get_render_cache_dir() / f"{key}{profile_extension(profile)}"
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def store(key, image, profile=None, options=None):
+    """
+    Encode an image into the cache and prune old renders.
+
+    Args:
+        key: Render key from render_key()
+        image: Composed PIL image
+        profile: Output profile name
+        options: Encoder option overrides
+
+    Returns:
+        Path: Cached file
+    """
+    cache_dir = get_render_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    extension = profile_extension(profile)
+    path = cache_dir / f"{key}{extension}"
+    fd, tmp = tempfile.mkstemp(prefix='.render-', suffix=extension, dir=cache_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            encode(image, f, profile, options)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    prune()
+    return path
+
+
+def prune(max_renders=None):
+    """Delete the least recently used renders beyond the configured count."""
+    keep = _max_renders if max_renders is None else max_renders
+    try:
+        entries = [entry for entry in os.scandir(get_render_cache_dir())
+                   if not entry.name.startswith('.')]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in entries[keep:]:
+        try:
+            os.unlink(entry.path)
+            logger.debug(f"Pruned render: {entry.name}")
+        except OSError as e:
+            logger.debug(f"Could not prune render {entry.name}: {e}")
+
+
+def _default_file_mode():
+    """Get the mode of a newly created file under the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _copy_to(src, dest):
+    """Copy a render to the wallpaper path, replacing it atomically."""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.multiwall-', suffix=dest.suffix, dir=dest.parent)
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        # mkstemp creates the file private (0600); give it the mode a
+        # plainly written file would have
+        os.chmod(tmp, _default_file_mode())
+        os.replace(tmp, dest)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def render_to_file(rects, states, output_path, profile=None, options=None):
+    """
+    Write the composed wallpaper to output_path, reusing a cached render.
+
+    Args:
+        rects: List of (x, y, width, height) monitor rectangles
+        states: Dict of monitor states
+        output_path: Where the wallpaper is written
+        profile: Output profile name (see encoders.PROFILES)
+        options: Encoder option overrides
+
+    Returns:
+        bool: True if a cached render was reused
+
+    Raises:
+        ValueError: If output_path's extension does not match the profile's
+            format
+    """
+    from .composer import compose_rects
+
+    if not extension_matches(output_path, profile):
+        raise ValueError(
+            f"Output file {output_path} does not match the {get_profile(profile)} "
+            f"profile (expected a {profile_extension(profile)} file)"
+        )
+
+    key = render_key(rects, states, profile, options) if _max_renders else None
+    cached = lookup(key, profile) if key else None
+    if cached is not None:
+        logger.info(f"Reusing cached render {key[:12]}")
+        _copy_to(cached, output_path)
+        return True
+
+    combined = compose_rects(rects, states)
+    if key:
+        try:
+            _copy_to(store(key, combined, profile, options), output_path)
+            return False
+        except OSError as e:
+            logger.warning(f"Could not use render cache: {e}")
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    encode(combined, output_path, profile, options)
+    return False
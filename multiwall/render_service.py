@@ -0,0 +1,119 @@
+"""
+Background rendering for MultiWall.
+Runs compose jobs on a worker pool off the GTK main loop and delivers
+results back to it, coalescing stale jobs.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gi.repository import GLib
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RenderService:
+    """
+    Runs render jobs on a worker pool, delivering only the newest result.
+
+    At most one job runs and at most one waits: submitting while a job is
+    running replaces any job still waiting. A finished job's result is
+    delivered unless a newer result was already delivered, so the view keeps
+    updating while the newest job renders.
+
+    A job may come with a draft job, run first and delivered as soon as it
+    is ready; the draft is dropped, and the job skipped, if a newer job is
+    submitted meanwhile. A draft returning None is not delivered.
+    """
+
+    def __init__(self):
+        # A single worker: jobs share the composer's retained preview canvas
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='multiwall-render'
+        )
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._running = False
+        self._pending = None
+        self._delivered = (0, 0)  # (generation, stage) of the last delivery
+
+    @property
+    def generation(self):
+        """Generation number of the newest submitted job."""
+        return self._generation
+
+    def is_current(self, generation):
+        """Check whether generation is still the newest submitted job."""
+        return generation == self._generation
+
+    def submit(self, job, callback, error_callback=None, draft=None):
+        """
+        Submit a render job.
+
+        Args:
+            job: Callable run on a worker thread, receiving the job generation
+            callback: Called on the main loop with the job result
+            error_callback: Optional, called on the main loop with the exception
+            draft: Optional callable like job, producing a quick approximate
+                result that is passed to callback before job runs, or None
+                to deliver nothing until the job finishes
+
+        Returns:
+            int: Generation number of the submitted job
+        """
+        with self._lock:
+            self._generation += 1
+            entry = (self._generation, job, callback, error_callback, draft)
+            if self._running:
+                if self._pending is not None:
+                    logger.debug("Dropping stale render job %s", self._pending[0])
+                self._pending = entry
+                return entry[0]
+            self._running = True
+        self._executor.submit(self._run, entry)
+        return entry[0]
+
+    def shutdown(self):
+        """Stop accepting jobs and drop the pending one."""
+        with self._lock:
+            self._pending = None
+            self._generation += 1
+        self._executor.shutdown(wait=False)
+
+    def _run(self, entry):
+        while entry is not None:
+            generation, job, callback, error_callback, draft = entry
+            stages = [(0, draft), (1, job)] if draft else [(1, job)]
+            for stage, func in stages:
+                if not self.is_current(generation):
+                    logger.debug("Skipping stale render job %s", generation)
+                    break
+                try:
+                    result = func(generation)
+                    if stage == 0 and result is None:
+                        continue
+                    GLib.idle_add(self._deliver, (generation, stage), callback, result)
+                except Exception as e:
+                    logger.error(f"Render job {generation} failed: {e}", exc_info=True)
+                    if error_callback:
+                        GLib.idle_add(self._deliver, (generation, stage), error_callback, e)
+                    break
+
+            with self._lock:
+                entry = self._pending
+                self._pending = None
+                if entry is None:
+                    self._running = False
+
+    def _deliver(self, stamp, callback, result):
+        # Drafts are dropped once a newer job is submitted; final results
+        # still replace anything older
+        generation, stage = stamp
+        if stamp > self._delivered and (stage or self.is_current(generation)):
+            self._delivered = stamp
+            callback(result)
+        else:
+            logger.debug("Discarding result of stale render job %s", generation)
+        return False
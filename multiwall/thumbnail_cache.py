@@ -0,0 +1,180 @@
+"""
+Persistent thumbnail cache following the freedesktop.org thumbnail spec.
+Thumbnails are shared with file managers: they are stored as PNG files named
+after the MD5 of the file URI and validated against the file's mtime.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from PIL import Image, PngImagePlugin
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+NORMAL_SIZE = 128
+SOFTWARE = "MultiWall"
+FAIL_DIR_NAME = "multiwall"
+
+
+def get_thumbnails_dir():
+    """
+    Get the base thumbnails directory.
+
+    Inside Flatpak the host cache is preferred so thumbnails created by the
+    file manager are reused.
+
+    Returns:
+        Path: Base directory ($XDG_CACHE_HOME/thumbnails)
+    """
+    if os.path.exists('/.flatpak-info'):
+        # XDG_CACHE_HOME points inside the sandbox; use the host cache
+        cache_home = os.environ.get('HOST_XDG_CACHE_HOME') or str(Path.home() / ".cache")
+    else:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / ".cache")
+    return Path(cache_home) / "thumbnails"
+
+
+def file_uri(path):
+    """Get the canonical file:// URI of a path."""
+    return Path(os.path.abspath(path)).as_uri()
+
+
+def thumbnail_path_for(path):
+    """
+    Get where the normal-size thumbnail of a file is stored.
+
+    Args:
+        path: Path to the image file
+
+    Returns:
+        Path: Thumbnail PNG path (may not exist)
+    """
+    digest = hashlib.md5(file_uri(path).encode('utf-8')).hexdigest()
+    return get_thumbnails_dir() / "normal" / f"{digest}.png"
+
+
+def _fail_path_for(path):
+    digest = hashlib.md5(file_uri(path).encode('utf-8')).hexdigest()
+    return get_thumbnails_dir() / "fail" / FAIL_DIR_NAME / f"{digest}.png"
+
+
+def _is_valid(thumb_path, st):
+    """Check that a thumbnail exists and matches the source mtime."""
+    try:
+        with Image.open(thumb_path) as thumb:
+            mtime = thumb.info.get('Thumb::MTime')
+    except Exception:
+        return False
+    try:
+        return mtime is not None and int(mtime) == int(st.st_mtime)
+    except ValueError:
+        return False
+
+
+def _write_png(dest, img, uri, st):
+    """Write a thumbnail PNG atomically with the required metadata."""
+    dest.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    info = PngImagePlugin.PngInfo()
+    info.add_text('Thumb::URI', uri)
+    info.add_text('Thumb::MTime', str(int(st.st_mtime)))
+    info.add_text('Thumb::Size', str(st.st_size))
+    info.add_text('Software', SOFTWARE)
+    fd, tmp = tempfile.mkstemp(prefix='.multiwall-', suffix='.png', dir=dest.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            img.save(f, format='PNG', pnginfo=info)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, dest)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def invalidate_thumbnail(path):
+    """
+    Delete the cached thumbnail (and failure marker) of a file.
+
+    Thumbnails are validated by mtime in whole seconds, so one generated
+    while the file was still being written may otherwise look current.
+
+    Args:
+        path: Path to the image file
+    """
+    for thumb_path in (thumbnail_path_for(path), _fail_path_for(path)):
+        try:
+            thumb_path.unlink()
+            logger.debug("Thumbnail invalidated: %s", thumb_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug("Could not remove thumbnail %s: %s", thumb_path, e)
+
+
+def lookup_thumbnail(path):
+    """
+    Find an up-to-date cached thumbnail without generating one.
+
+    Args:
+        path: Path to the image file
+
+    Returns:
+        str: Thumbnail path or None if missing or stale
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    thumb_path = thumbnail_path_for(path)
+    if _is_valid(thumb_path, st):
+        return str(thumb_path)
+    return None
+
+
+def get_thumbnail(path):
+    """
+    Get a cached thumbnail, generating it if missing or stale.
+
+    Args:
+        path: Path to the image file
+
+    Returns:
+        str: Thumbnail path or None if the image cannot be thumbnailed
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.debug("Cannot stat %s: %s", path, e)
+        return None
+
+    thumb_path = thumbnail_path_for(path)
+    if _is_valid(thumb_path, st):
+        return str(thumb_path)
+
+    # Don't retry files that already failed with the same mtime
+    fail_path = _fail_path_for(path)
+    if _is_valid(fail_path, st):
+        logger.debug("Skipping previously failed thumbnail: %s", os.path.basename(path))
+        return None
+
+    uri = file_uri(path)
+    try:
+        with Image.open(path) as src:
+            src.draft(None, (NORMAL_SIZE, NORMAL_SIZE))
+            img = src.convert('RGBA' if 'A' in src.getbands() or 'transparency' in src.info else 'RGB')
+        img.thumbnail((NORMAL_SIZE, NORMAL_SIZE), Image.Resampling.LANCZOS)
+        _write_png(thumb_path, img, uri, st)
+        logger.debug("Thumbnail generated: %s -> %s", os.path.basename(path), thumb_path)
+        return str(thumb_path)
+    except Exception as e:
+        logger.debug("Could not generate thumbnail for %s: %s", os.path.basename(path), e)
+        try:
+            _write_png(fail_path, Image.new('RGBA', (1, 1)), uri, st)
+        except Exception:
+            pass
+        return None
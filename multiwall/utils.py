@@ -1,39 +1,40 @@
-from gi.repository import GdkPixbuf, GLib
+from gi import require_version
+require_version('Gdk', '4.0')
+from gi.repository import Gdk, GLib
 
+# Formatos de memoria de GDK equivalentes a los modos de Pillow
+_MEMORY_FORMATS = {
+    'RGB': (Gdk.MemoryFormat.R8G8B8, 3),
+    'RGBA': (Gdk.MemoryFormat.R8G8B8A8, 4),
+}
 
-def pil_to_pixbuf(pil_image):
+
+def pil_to_texture(pil_image):
     """
-    Convierte una imagen PIL a GdkPixbuf para GTK4.
+    Convierte una imagen PIL a Gdk.MemoryTexture para GTK4.
+    
+    Las imágenes RGB y RGBA se usan en su formato nativo; el resto se
+    convierte a RGBA si tiene transparencia o a RGB si no. Puede llamarse
+    desde hilos de trabajo.
     
     Args:
         pil_image: PIL.Image object
         
     Returns:
-        GdkPixbuf.Pixbuf
+        Gdk.MemoryTexture
     """
-    # Asegurar que la imagen esté en RGB
-    if pil_image.mode != 'RGB':
-        pil_image = pil_image.convert('RGB')
+    if pil_image.mode not in _MEMORY_FORMATS:
+        has_alpha = 'A' in pil_image.getbands() or 'transparency' in pil_image.info
+        pil_image = pil_image.convert('RGBA' if has_alpha else 'RGB')
     
-    # Obtener dimensiones
+    memory_format, bytes_per_pixel = _MEMORY_FORMATS[pil_image.mode]
     width, height = pil_image.size
     
-    # Convertir a bytes
-    data = pil_image.tobytes()
-    
-    # Crear GLib.Bytes
-    bytes_data = GLib.Bytes.new(data)
-    
-    # Crear Pixbuf desde bytes
-    # Parámetros: bytes, colorspace, has_alpha, bits_per_sample, width, height, rowstride
-    pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(
-        bytes_data,
-        GdkPixbuf.Colorspace.RGB,
-        False,  # No alpha
-        8,      # 8 bits por muestra
+    # tobytes() entrega las filas empaquetadas, sin relleno
+    return Gdk.MemoryTexture.new(
         width,
         height,
-        width * 3  # rowstride: 3 bytes por pixel (RGB)
+        memory_format,
+        GLib.Bytes.new(pil_image.tobytes()),
+        width * bytes_per_pixel
     )
-    
-    return pixbuf
\ No newline at end of file
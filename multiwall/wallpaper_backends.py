@@ -0,0 +1,423 @@
+"""
+Desktop-specific wallpaper backends.
+Each backend knows how to detect its desktop and set a spanned wallpaper
+there. The backend for the running session is probed once and cached, and
+all D-Bus traffic goes through one shared session bus connection instead
+of a dbus-send process per call.
+"""
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+from .logger import get_logger
+from .profiling import span
+
+logger = get_logger(__name__)
+
+DBUS_TIMEOUT_MS = 5000
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_session_bus():
+    """
+    Get the shared session bus connection, connecting on first use.
+
+    Returns:
+        Gio.DBusConnection: Connection or None if the bus is unavailable
+    """
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            try:
+                from gi.repository import Gio
+                _bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+            except Exception as e:
+                logger.debug(f"Session bus not available: {e}")
+                return None
+        return _bus
+
+
+def set_session_bus(connection):
+    """
+    Use a given D-Bus connection for all backends.
+
+    Args:
+        connection: Gio.DBusConnection, e.g. to a private dbus-daemon
+            created with Gio.DBusConnection.new_for_address_sync(); None
+            reconnects to the session bus on next use
+    """
+    global _bus
+    with _bus_lock:
+        _bus = connection
+    reset_backend()
+
+
+def dbus_call(bus_name, object_path, interface, method, parameters=None, reply_type=None):
+    """
+    Call a D-Bus method on the shared connection.
+
+    Args:
+        bus_name: Destination bus name
+        object_path: Object path
+        interface: Interface name
+        method: Method name
+        parameters: GLib.Variant tuple of arguments, or None
+        reply_type: Expected reply signature such as '(b)', or None
+
+    Returns:
+        tuple: Unpacked reply values
+
+    Raises:
+        RuntimeError: If there is no session bus
+        GLib.Error: If the call fails
+    """
+    bus = get_session_bus()
+    if bus is None:
+        raise RuntimeError("No D-Bus session bus")
+    from gi.repository import Gio, GLib
+    with span('dbus_call', method=f"{interface}.{method}"):
+        reply = bus.call_sync(
+            bus_name, object_path, interface, method, parameters,
+            GLib.VariantType.new(reply_type) if reply_type else None,
+            Gio.DBusCallFlags.NONE, DBUS_TIMEOUT_MS, None
+        )
+    return reply.unpack() if reply is not None else ()
+
+
+def name_has_owner(bus_name):
+    """Check whether a service owns a name on the session bus."""
+    try:
+        from gi.repository import GLib
+        return dbus_call(
+            'org.freedesktop.DBus', '/org/freedesktop/DBus', 'org.freedesktop.DBus',
+            'NameHasOwner', GLib.Variant('(s)', (bus_name,)), '(b)'
+        )[0]
+    except Exception as e:
+        logger.debug(f"Could not query bus name {bus_name}: {e}")
+        return False
+
+
+def current_desktops():
+    """Get the names in XDG_CURRENT_DESKTOP, upper-cased."""
+    return [name.upper() for name in os.environ.get('XDG_CURRENT_DESKTOP', '').split(':') if name]
+
+
+def monitor_crops(image_path, rects, tag=None):
+    """
+    Cut a spanned wallpaper into one image per monitor.
+
+    Some desktops only take a wallpaper per monitor. Crops are written
+    next to image_path with a name that changes with the image, so the
+    desktop does not keep showing a cached copy; older crops are removed.
+
+    Args:
+        image_path: Composed wallpaper covering all monitors
+        rects: List of (x, y, width, height) monitor rectangles
+        tag: Name fragment identifying this version of the image
+            (default: the image's modification time)
+
+    Returns:
+        list: ((x, y, width, height), crop path) for each monitor
+    """
+    from PIL import Image
+
+    image_path = Path(image_path)
+    tag = tag or format(image_path.stat().st_mtime_ns, 'x')
+    prefix = f"{image_path.stem}-monitor"
+    for old in image_path.parent.glob(f"{prefix}*.png"):
+        if not old.name.endswith(f"-{tag}.png"):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    min_x = min(r[0] for r in rects)
+    min_y = min(r[1] for r in rects)
+    crops = []
+    with Image.open(image_path) as image:
+        for i, (x, y, w, h) in enumerate(rects):
+            crop_path = image_path.parent / f"{prefix}{i}-{tag}.png"
+            if not crop_path.exists():
+                box = (x - min_x, y - min_y, x - min_x + w, y - min_y + h)
+                image.crop(box).save(crop_path, format='PNG', compress_level=1)
+            crops.append(((x, y, w, h), str(crop_path)))
+    return crops
+
+
+class WallpaperBackend:
+    """Base class of wallpaper backends."""
+
+    name = None
+
+    def probe(self):
+        """
+        Check whether this backend can set the wallpaper in this session.
+
+        Returns:
+            bool: True if usable
+        """
+        raise NotImplementedError
+
+    def apply(self, image_path, rects=None):
+        """
+        Set a spanned wallpaper.
+
+        Args:
+            image_path: Composed wallpaper covering all monitors
+            rects: Monitor rectangles the image was composed for, used by
+                backends that set one image per monitor
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        raise NotImplementedError
+
+
+class GnomeBackend(WallpaperBackend):
+    """GNOME: org.gnome.desktop.background through Gio.Settings."""
+
+    name = 'gnome'
+
+    def probe(self):
+        desktops = current_desktops()
+        if 'GNOME' in desktops or 'UNITY' in desktops:
+            return True
+        return name_has_owner('org.gnome.Shell')
+
+    def apply(self, image_path, rects=None):
+        from .wallpaper_setter import (
+            apply_wallpaper_gio, apply_wallpaper_native, notify_gnome_wallpaper_change
+        )
+        result = None
+        try:
+            result = apply_wallpaper_gio(image_path)
+        except Exception as e:
+            logger.warning(f"Gio.Settings failed, trying gsettings: {e}")
+        if result is None:
+            return apply_wallpaper_native(image_path)
+        if result[0]:
+            notify_gnome_wallpaper_change()
+        return result
+
+
+class KdeBackend(WallpaperBackend):
+    """KDE Plasma: desktop scripting through org.kde.PlasmaShell."""
+
+    name = 'kde'
+
+    SCRIPT = """
+var files = %s;
+var all = desktops();
+for (var i = 0; i < all.length; i++) {
+    var d = all[i];
+    var g = screenGeometry(d.screen);
+    var file = files[g.x + "," + g.y] || files["*"];
+    if (!file) continue;
+    d.wallpaperPlugin = "org.kde.image";
+    d.currentConfigGroup = ["Wallpaper", "org.kde.image", "General"];
+    d.writeConfig("Image", file);
+    d.writeConfig("FillMode", %d);
+}
+"""
+    FILL_MODE_STRETCH = 0  # Crops match their monitor exactly
+    FILL_MODE_CROP = 2
+
+    def probe(self):
+        return 'KDE' in current_desktops() and name_has_owner('org.kde.plasmashell')
+
+    def apply(self, image_path, rects=None):
+        from gi.repository import GLib
+        if rects and len(rects) > 1:
+            crops = monitor_crops(image_path, rects)
+            files = {f"{x},{y}": Path(path).as_uri() for (x, y, w, h), path in crops}
+            fill_mode = self.FILL_MODE_STRETCH
+        else:
+            # Same image on every screen
+            files = {'*': Path(image_path).as_uri()}
+            fill_mode = self.FILL_MODE_CROP
+        script = self.SCRIPT % (json.dumps(files), fill_mode)
+        try:
+            dbus_call(
+                'org.kde.plasmashell', '/PlasmaShell', 'org.kde.PlasmaShell',
+                'evaluateScript', GLib.Variant('(s)', (script,))
+            )
+        except Exception as e:
+            logger.error(f"Plasma scripting failed: {e}")
+            return False, f"Error setting the Plasma wallpaper: {e}"
+        logger.info("Wallpaper applied with Plasma scripting")
+        return True, "Wallpaper applied successfully"
+
+
+class XfceBackend(WallpaperBackend):
+    """XFCE: xfce4-desktop properties through the Xfconf D-Bus service."""
+
+    name = 'xfce'
+
+    CHANNEL = 'xfce4-desktop'
+    IMAGE_STYLE_SPANNING = 6
+
+    def probe(self):
+        return 'XFCE' in current_desktops() and name_has_owner('org.xfce.Xfconf')
+
+    def _call(self, method, parameters, reply_type=None):
+        return dbus_call('org.xfce.Xfconf', '/org/xfce/Xfconf', 'org.xfce.Xfconf',
+                         method, parameters, reply_type)
+
+    def apply(self, image_path, rects=None):
+        from gi.repository import GLib
+        try:
+            properties = self._call(
+                'GetAllProperties', GLib.Variant('(ss)', (self.CHANNEL, '/backdrop')), '(a{sv})'
+            )[0]
+            # One last-image property per monitor and workspace
+            image_props = [name for name in properties if name.endswith('/last-image')]
+            if not image_props:
+                return False, "No XFCE backdrop properties found"
+            for prop in image_props:
+                base = prop[:-len('/last-image')]
+                self._call('SetProperty', GLib.Variant(
+                    '(ssv)', (self.CHANNEL, f"{base}/image-style", GLib.Variant('i', self.IMAGE_STYLE_SPANNING))
+                ))
+                self._call('SetProperty', GLib.Variant(
+                    '(ssv)', (self.CHANNEL, prop, GLib.Variant('s', str(image_path)))
+                ))
+        except Exception as e:
+            logger.error(f"Xfconf failed: {e}")
+            return False, f"Error setting the XFCE wallpaper: {e}"
+        logger.info(f"Wallpaper applied with xfconf ({len(image_props)} backdrops)")
+        return True, "Wallpaper applied successfully"
+
+
+class SwayBackend(WallpaperBackend):
+    """sway: one swaybg image per output, set through swaymsg."""
+
+    name = 'sway'
+
+    def probe(self):
+        return bool(os.environ.get('SWAYSOCK')) and shutil.which('swaymsg') is not None
+
+    def apply(self, image_path, rects=None):
+        try:
+            result = subprocess.run(['swaymsg', '-t', 'get_outputs', '-r'],
+                                    capture_output=True, text=True, timeout=5)
+            outputs = [o for o in json.loads(result.stdout) if o.get('active')]
+            if not outputs:
+                return False, "No active sway outputs"
+            if rects is None:
+                # Assume the image was composed for sway's own layout
+                rects = [(o['rect']['x'], o['rect']['y'], o['rect']['width'], o['rect']['height'])
+                         for o in outputs]
+            # Crop by the layout the image was composed for, giving each
+            # output the monitor at its position
+            crops = {(x, y): path for (x, y, w, h), path in monitor_crops(image_path, rects)}
+            assignments = []
+            for o in outputs:
+                path = crops.get((o['rect']['x'], o['rect']['y']))
+                if path is None:
+                    logger.warning(f"No monitor of the wallpaper at the position of output {o['name']}")
+                    continue
+                assignments.append((o['name'], path))
+            if not assignments:
+                return False, "The monitor layout does not match the sway outputs"
+            # All outputs in one swaymsg call
+            commands = '; '.join(
+                f"output {json.dumps(name)} bg {json.dumps(path)} fill"
+                for name, path in assignments
+            )
+            with span('swaymsg'):
+                result = subprocess.run(['swaymsg', commands],
+                                        capture_output=True, text=True, timeout=10)
+        except Exception as e:
+            logger.error(f"swaymsg failed: {e}")
+            return False, f"Error setting the sway wallpaper: {e}"
+        if result.returncode != 0:
+            logger.error(f"swaymsg failed: {result.stdout.strip()} {result.stderr.strip()}")
+            return False, f"Error setting the sway wallpaper: {result.stderr.strip()}"
+        logger.info(f"Wallpaper applied with swaybg on {len(assignments)} of {len(outputs)} outputs")
+        return True, "Wallpaper applied successfully"
+
+
+class FehBackend(WallpaperBackend):
+    """X11 window managers without a desktop: the root window through feh."""
+
+    name = 'feh'
+
+    def probe(self):
+        return (bool(os.environ.get('DISPLAY')) and not os.environ.get('WAYLAND_DISPLAY')
+                and shutil.which('feh') is not None)
+
+    def apply(self, image_path, rects=None):
+        try:
+            # --no-xinerama spans the image over all monitors
+            with span('feh'):
+                result = subprocess.run(['feh', '--bg-fill', '--no-xinerama', str(image_path)],
+                                        capture_output=True, text=True, timeout=10)
+        except Exception as e:
+            logger.error(f"feh failed: {e}")
+            return False, f"Error running feh: {e}"
+        if result.returncode != 0:
+            logger.error(f"feh failed: {result.stderr.strip()}")
+            return False, f"Error running feh: {result.stderr.strip()}"
+        logger.info("Wallpaper applied with feh")
+        return True, "Wallpaper applied successfully"
+
+
+# Probed in order; the first usable one is used
+BACKENDS = [GnomeBackend, KdeBackend, XfceBackend, SwayBackend, FehBackend]
+
+_NOT_PROBED = object()
+_backend = _NOT_PROBED
+_backend_lock = threading.Lock()
+
+
+def register_backend(backend_class, first=False):
+    """
+    Add a backend to the registry.
+
+    Args:
+        backend_class: WallpaperBackend subclass
+        first: Probe it before the built-in backends
+    """
+    if first:
+        BACKENDS.insert(0, backend_class)
+    else:
+        BACKENDS.append(backend_class)
+    reset_backend()
+
+
+def reset_backend():
+    """Forget the detected backend so the next call probes again."""
+    global _backend
+    with _backend_lock:
+        _backend = _NOT_PROBED
+
+
+def detect_backend():
+    """
+    Get the backend for this session, probing the registry on first use.
+
+    Returns:
+        WallpaperBackend: Detected backend or None
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is _NOT_PROBED:
+            _backend = None
+            with span('probe_backends'):
+                for backend_class in BACKENDS:
+                    backend = backend_class()
+                    try:
+                        usable = backend.probe()
+                    except Exception as e:
+                        logger.debug(f"Probing {backend.name} failed: {e}")
+                        usable = False
+                    if usable:
+                        _backend = backend
+                        break
+            logger.info(f"Wallpaper backend: {_backend.name if _backend else 'none detected'}")
+        return _backend
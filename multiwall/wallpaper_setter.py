@@ -1,14 +1,20 @@
 """
 Module for applying wallpapers that works in both Flatpak and native environments.
+The wallpaper is set by the backend detected for the desktop, natively and
+in Flatpak (see wallpaper_backends); on GNOME, org.gnome.desktop.background is written
+in-process through Gio.Settings, with the gsettings command as fallback.
 """
 import os
 import subprocess
 from pathlib import Path
 
 from .logger import get_logger
+from .profiling import span
 
 logger = get_logger(__name__)
 
+BACKGROUND_SCHEMA = 'org.gnome.desktop.background'
+
 
 def is_running_in_flatpak():
     """Detect if running inside a Flatpak container."""
@@ -24,11 +30,17 @@ def is_running_in_docker():
     return in_docker
 
 
-def get_wallpaper_path():
-    """Get path where wallpaper should be saved based on environment."""
+def get_wallpaper_path(profile=None):
+    """
+    Get path where wallpaper should be saved based on environment.
+    
+    Args:
+        profile: Output profile; its format decides the file extension
+    """
+    from .encoders import profile_extension
     config_dir = Path.home() / ".config" / "multiwall"
     config_dir.mkdir(parents=True, exist_ok=True)
-    wallpaper_path = str(config_dir / "current_wallpaper.jpg")
+    wallpaper_path = str(config_dir / f"current_wallpaper{profile_extension(profile)}")
     logger.debug(f"Wallpaper path: {wallpaper_path}")
     return wallpaper_path
 
@@ -37,12 +49,13 @@ def test_gsettings_access():
     """Test if we can access gsettings."""
     logger.debug("Testing gsettings access...")
     try:
-        result = subprocess.run(
-            ['gsettings', 'get', 'org.gnome.desktop.background', 'picture-uri'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        with span('gsettings', op='get picture-uri'):
+            result = subprocess.run(
+                ['gsettings', 'get', 'org.gnome.desktop.background', 'picture-uri'],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
         logger.debug(f"gsettings test return code: {result.returncode}")
         logger.debug(f"gsettings test stdout: {result.stdout.strip()}")
         if result.stderr:
@@ -57,18 +70,15 @@ def test_gsettings_access():
 
 
 def notify_gnome_wallpaper_change():
-    """Notify GNOME Shell that wallpaper changed using D-Bus."""
+    """Notify GNOME Shell that wallpaper changed, over the shared D-Bus connection."""
     logger.debug("Notifying GNOME Shell about wallpaper change...")
     try:
-        subprocess.run([
-            'dbus-send',
-            '--session',
-            '--dest=org.gnome.Shell',
-            '--type=method_call',
-            '/org/gnome/Shell',
-            'org.gnome.Shell.Eval',
-            'string:Main.loadTheme();'
-        ], capture_output=True, timeout=5)
+        from gi.repository import GLib
+        from .wallpaper_backends import dbus_call
+        dbus_call(
+            'org.gnome.Shell', '/org/gnome/Shell', 'org.gnome.Shell', 'Eval',
+            GLib.Variant('(s)', ('Main.loadTheme();',)), '(bs)'
+        )
         logger.info("GNOME Shell notification sent")
         return True
     except Exception as e:
@@ -76,6 +86,86 @@ def notify_gnome_wallpaper_change():
         return False
 
 
+def get_background_settings():
+    """
+    Get the GNOME background settings through Gio.
+    
+    Returns:
+        Gio.Settings: Settings for BACKGROUND_SCHEMA, or None if Gio or the
+            schema is not available
+    """
+    try:
+        from gi.repository import Gio
+    except (ImportError, ValueError) as e:
+        logger.debug(f"Gio not available: {e}")
+        return None
+    source = Gio.SettingsSchemaSource.get_default()
+    if source is None or source.lookup(BACKGROUND_SCHEMA, True) is None:
+        logger.debug(f"GSettings schema not installed: {BACKGROUND_SCHEMA}")
+        return None
+    # Without dconf, GSettings falls back to a backend the desktop never
+    # sees (in Flatpak, a keyfile inside the sandbox)
+    backend = Gio.SettingsBackend.get_default().__gtype__.name
+    if backend in ('GMemorySettingsBackend', 'GNullSettingsBackend', 'GKeyfileSettingsBackend'):
+        logger.debug(f"GSettings backend not shared with the desktop: {backend}")
+        return None
+    return Gio.Settings.new(BACKGROUND_SCHEMA)
+
+
+def apply_wallpaper_gio(image_path, settings=None):
+    """
+    Apply wallpaper by writing the GNOME background settings in-process.
+    
+    All keys are committed as one change with delay()/apply(), then synced
+    to the settings backend (dconf).
+    
+    Args:
+        image_path: Full path to wallpaper image
+        settings: Gio.Settings for org.gnome.desktop.background (default:
+            the user's settings); a settings object on the memory backend
+            can be passed for testing
+        
+    Returns:
+        tuple: (success: bool, message: str), or None if Gio settings are
+            not available and another method should be used
+    """
+    if settings is None:
+        settings = get_background_settings()
+        if settings is None:
+            return None
+    from gi.repository import Gio
+    
+    picture_uri = f'file://{image_path}'
+    schema = settings.props.settings_schema
+    values = [('picture-uri', picture_uri), ('picture-options', 'spanned')]
+    # picture-uri-dark only exists since GNOME 42
+    if schema is None or schema.has_key('picture-uri-dark'):
+        values.insert(1, ('picture-uri-dark', picture_uri))
+    
+    logger.info("Applying wallpaper with Gio.Settings...")
+    with span('gio_settings'):
+        for key, _ in values:
+            if not settings.is_writable(key):
+                logger.warning(f"GSettings key not writable: {key}")
+                return False, f"Cannot write setting {key}"
+        settings.delay()
+        try:
+            for key, value in values:
+                if not settings.set_string(key, value):
+                    settings.revert()
+                    logger.warning(f"Invalid value for {key}: {value}")
+                    return False, f"Cannot write setting {key}"
+            settings.apply()
+        except Exception:
+            settings.revert()
+            raise
+        Gio.Settings.sync()
+    
+    logger.debug(f"Current picture-uri: {settings.get_string('picture-uri')}")
+    logger.info("Wallpaper applied successfully with Gio.Settings")
+    return True, "Wallpaper applied successfully"
+
+
 def apply_wallpaper_native(image_path):
     """
     Apply wallpaper using gsettings (native method).
@@ -98,10 +188,11 @@ def apply_wallpaper_native(image_path):
         
         # Set picture-uri
         logger.debug("Setting picture-uri...")
-        result = subprocess.run([
-            'gsettings', 'set', 'org.gnome.desktop.background',
-            'picture-uri', picture_uri
-        ], capture_output=True, text=True, timeout=10)
+        with span('gsettings', op='set picture-uri'):
+            result = subprocess.run([
+                'gsettings', 'set', 'org.gnome.desktop.background',
+                'picture-uri', picture_uri
+            ], capture_output=True, text=True, timeout=10)
         
         if result.returncode != 0:
             logger.error(f"Failed to set picture-uri: {result.stderr}")
@@ -110,26 +201,29 @@ def apply_wallpaper_native(image_path):
         
         # Set picture-uri-dark
         logger.debug("Setting picture-uri-dark...")
-        result = subprocess.run([
-            'gsettings', 'set', 'org.gnome.desktop.background',
-            'picture-uri-dark', picture_uri
-        ], capture_output=True, text=True, timeout=10)
+        with span('gsettings', op='set picture-uri-dark'):
+            result = subprocess.run([
+                'gsettings', 'set', 'org.gnome.desktop.background',
+                'picture-uri-dark', picture_uri
+            ], capture_output=True, text=True, timeout=10)
         logger.debug(f"picture-uri-dark set (return code: {result.returncode})")
         
         # Set picture-options to spanned
         logger.debug("Setting picture-options to 'spanned'...")
-        result = subprocess.run([
-            'gsettings', 'set', 'org.gnome.desktop.background',
-            'picture-options', 'spanned'
-        ], capture_output=True, text=True, timeout=10)
+        with span('gsettings', op='set picture-options'):
+            result = subprocess.run([
+                'gsettings', 'set', 'org.gnome.desktop.background',
+                'picture-options', 'spanned'
+            ], capture_output=True, text=True, timeout=10)
         logger.debug(f"picture-options set (return code: {result.returncode})")
         
         # Verify application
         logger.debug("Verifying wallpaper was applied...")
-        result = subprocess.run([
-            'gsettings', 'get', 'org.gnome.desktop.background',
-            'picture-uri'
-        ], capture_output=True, text=True, timeout=5)
+        with span('gsettings', op='verify picture-uri'):
+            result = subprocess.run([
+                'gsettings', 'get', 'org.gnome.desktop.background',
+                'picture-uri'
+            ], capture_output=True, text=True, timeout=5)
         current_uri = result.stdout.strip()
         logger.info(f"Current picture-uri: {current_uri}")
         
@@ -182,12 +276,14 @@ echo "Image: {image_path}"
         return None
 
 
-def apply_wallpaper(image_path):
+def apply_wallpaper(image_path, rects=None):
     """
     Apply wallpaper using the appropriate method based on environment.
     
     Args:
         image_path: Path to wallpaper image
+        rects: Monitor rectangles the image was composed for, needed by
+            desktops that take one image per monitor
         
     Returns:
         tuple: (success: bool, message: str, script_path: str or None)
@@ -214,13 +310,16 @@ def apply_wallpaper(image_path):
         final_path = image_path
         logger.debug(f"Path for GNOME: {final_path}")
         
-        # Try direct gsettings (may not work in sandbox)
-        logger.info("Trying direct gsettings as fallback...")
-        success, message = apply_wallpaper_native(final_path)
+        # Same backends as natively: on GNOME, Gio.Settings reaches the host
+        # only through dconf (see the manifest); the sandbox's private
+        # keyfile backend is skipped and gsettings is tried instead
+        from .wallpaper_backends import GnomeBackend, detect_backend
+        backend = detect_backend() or GnomeBackend()
+        success, message = backend.apply(final_path, rects)
         if success:
             logger.info("Wallpaper applied successfully from Flatpak")
             return True, message, None
-        logger.warning(f"Direct gsettings failed: {message}")
+        logger.warning(f"{backend.name} backend failed from Flatpak: {message}")
         
         # If all fails, provide manual instructions
         script_path = create_manual_instructions(final_path)
@@ -239,11 +338,22 @@ def apply_wallpaper(image_path):
     # If running in Docker or native
     else:
         logger.info("Native/Docker mode detected")
-        success, message = apply_wallpaper_native(image_path)
+        from .wallpaper_backends import GnomeBackend, detect_backend
+        # Without a detected desktop, try GNOME settings as before
+        backend = detect_backend() or GnomeBackend()
+        success, message = backend.apply(image_path, rects)
         if success:
             logger.info("Wallpaper applied successfully")
             return True, message, None
         
+        if backend.name != 'gnome':
+            # The manual script uses gsettings, which only GNOME reads
+            logger.warning(f"{backend.name} backend failed: {message}")
+            return False, (
+                f"{backend.name} backend failed: {message}\n\n"
+                f"Wallpaper was generated at:\n{image_path}"
+            ), None
+        
         # Create fallback script
         script_path = create_manual_instructions(image_path)
         fallback_msg = (
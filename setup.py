@@ -14,6 +14,7 @@ setup(
     entry_points={
         "console_scripts": [
             "multiwall=multiwall.main:main",
+            "multiwall-cli=multiwall.cli:main",
         ],
     },
 )
\ No newline at end of file
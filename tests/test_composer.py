@@ -0,0 +1,81 @@
+"""
+Tests for the preview paths of the composer.
+Previews are rendered at reduced size; they must look like the
+full-resolution render scaled down.
+"""
+import pytest
+from PIL import Image
+
+from multiwall.composer import render_draft_tile, render_tile
+from multiwall.image_cache import get_image_cache
+
+FULL_SIZE = (1920, 1080)
+SCALE = 0.25
+PREVIEW_SIZE = (480, 270)
+SOURCE_COLOR = (200, 30, 30)
+
+
+@pytest.fixture
+def small_source(tmp_path):
+    """A source much smaller than the monitor, on a clear image cache."""
+    path = tmp_path / "small.png"
+    Image.new('RGB', (400, 300), SOURCE_COLOR).save(path)
+    get_image_cache().clear()
+    yield str(path)
+    get_image_cache().clear()
+
+
+def _state(path):
+    return {'file': path, 'mode': 'fit', 'background': '#000000'}
+
+
+def _source_box(tile):
+    """Bounding box of the pixels at least half source colored."""
+    red = tile.convert('RGB').getchannel('R')
+    return red.point(lambda v: 255 if v >= SOURCE_COLOR[0] // 2 else 0).getbbox()
+
+
+def _downscaled_full_render(path):
+    full, _ = render_tile(0, _state(path), FULL_SIZE)
+    return full.resize(PREVIEW_SIZE, Image.LANCZOS)
+
+
+def _assert_same_box(tile, expected):
+    box, expected_box = _source_box(tile), _source_box(expected)
+    assert box is not None
+    assert all(abs(a - b) <= 1 for a, b in zip(box, expected_box)), (box, expected_box)
+
+
+def test_fit_preview_keeps_small_source_at_native_size(small_source):
+    expected = _downscaled_full_render(small_source)
+    get_image_cache().clear()
+    tile, _ = render_tile(0, _state(small_source), PREVIEW_SIZE, scale=SCALE)
+    assert tile.size == PREVIEW_SIZE
+    _assert_same_box(tile, expected)
+
+
+def test_fit_draft_keeps_small_source_at_native_size(small_source):
+    expected = _downscaled_full_render(small_source)
+    # Only the full-resolution decode is cached
+    tile, _, complete = render_draft_tile(0, _state(small_source), PREVIEW_SIZE, SCALE)
+    assert complete
+    _assert_same_box(tile, expected)
+
+
+def test_fit_draft_matches_preview_decode(small_source):
+    preview, _ = render_tile(0, _state(small_source), PREVIEW_SIZE, scale=SCALE)
+    tile, _, complete = render_draft_tile(0, _state(small_source), PREVIEW_SIZE, SCALE)
+    assert complete
+    _assert_same_box(tile, preview)
+
+
+def test_fit_preview_shrinks_large_source(tmp_path):
+    path = tmp_path / "large.png"
+    Image.new('RGB', (3840, 1620), SOURCE_COLOR).save(path)
+    get_image_cache().clear()
+    try:
+        expected = _downscaled_full_render(str(path))
+        tile, _ = render_tile(0, _state(str(path)), PREVIEW_SIZE, scale=SCALE)
+    finally:
+        get_image_cache().clear()
+    _assert_same_box(tile, expected)